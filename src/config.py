@@ -26,6 +26,16 @@ class ScraperConfig:
     scroll_wait_min: float = 1.2
     scroll_wait_max: float = 2.4
     scroll_step: int = 300
+    incremental: bool = False
+    known_ids_path: str = os.path.join("data", "known_ad_ids.json")
+    known_stop_after: int = 5
+    parallel_contexts: int = 1
+    max_concurrent_pages: int = 0  # 0 = one per context
+    min_page_interval: float = 5.0
+    capture_images: bool = False
+    capture_max_mb: int = 256
+    block_unused_requests: bool = False
+    batch_extract: bool = True
 
 
 @dataclass
@@ -36,23 +46,115 @@ class MetaApiConfig:
     guarantee_page_ids: List[str] = field(default_factory=list)
     ad_reached_countries: str = "GB"
     explore_search_terms: List[str] = field(default_factory=list)
+    page_id_batch_size: int = 10  # search_page_ids accepts at most 10 IDs per request
+    max_concurrency: int = 4
+    max_retries: int = 5
+    backoff_base: float = 2.0
+    timeout: float = 20.0
+    usage_slowdown_pct: float = 75.0
+    max_throttle_delay: float = 60.0
+    cache_mode: str = "off"  # off | record | replay | refresh
+    cache_path: str = os.path.join("data", "meta_api_cache.sqlite")
+    cache_ttl_hours: float = 24.0
 
 
 @dataclass
 class StorageConfig:
     supabase_url: Optional[str]
     supabase_key: Optional[str]
+    backend: str = "supabase"  # 'supabase' or 'sqlite'
+    sqlite_path: str = os.path.join("data", "pipeline.sqlite")
     table: str = "ads"
     page_table: str = "pages"
+    chunk_size: int = 500
+    max_in_flight: int = 3
+    gzip: bool = False  # needs a gateway that accepts Content-Encoding: gzip
+    retries: int = 3
+    backoff_base: float = 1.0
+    timeout: float = 30.0
+    fingerprint_path: str = os.path.join("data", "upsert_fingerprints.sqlite")  # empty = send every row
+    fingerprint_max_age_days: float = 7.0
+
+
+@dataclass
+class DownloadConfig:
+    workers: int = 8
+    retries: int = 3
+    backoff_base: float = 1.0
+    timeout: float = 30.0
+    chunk_size: int = 64 * 1024
+
+
+@dataclass
+class OCRConfig:
+    workers: int = 0  # 0 = one per CPU core
+
+
+@dataclass
+class AnalysisConfig:
+    person_max_side: int = 640
+    person_workers: int = 4
+
+
+@dataclass
+class DedupeConfig:
+    text_jaccard: float = 0.8  # near-duplicate text threshold; <= 0 disables the tier
+    shingle_size: int = 5  # characters per shingle
+    min_shingles: int = 10  # shorter texts skip the near-duplicate check
+    num_perm: int = 128  # MinHash signature length
+
+
+@dataclass
+class FeatureCacheConfig:
+    path: str = os.path.join("data", "feature_cache.sqlite")  # empty disables the cache
+    max_age_days: int = 30
+    max_entries: int = 100_000
+
+
+@dataclass
+class StreamConfig:
+    enabled: bool = False
+    queue_size: int = 32
+    download_workers: int = 4
+    ocr_workers: int = 2
+    analysis_workers: int = 2
+
+
+@dataclass
+class TrendConfig:
+    history_path: str = os.path.join("data", "trend_history.npz")  # empty = no history
+    report_output: str = os.path.join("output", "trends.json")  # empty = not written
+
+
+@dataclass
+class ThumbnailConfig:
+    output_dir: str = os.path.join("output", "thumbs")  # empty = report links full-size images
+    widths: List[int] = field(default_factory=lambda: [320, 640])
+    workers: int = 4
+    webp_quality: int = 75
+    jpeg_quality: int = 80
 
 
 @dataclass
 class PipelineConfig:
     scraper: ScraperConfig
     storage: StorageConfig
+    stream: StreamConfig = field(default_factory=StreamConfig)
+    download: DownloadConfig = field(default_factory=DownloadConfig)
+    ocr: OCRConfig = field(default_factory=OCRConfig)
+    analysis: AnalysisConfig = field(default_factory=AnalysisConfig)
+    dedupe: DedupeConfig = field(default_factory=DedupeConfig)
+    feature_cache: FeatureCacheConfig = field(default_factory=FeatureCacheConfig)
+    trend: TrendConfig = field(default_factory=TrendConfig)
+    thumbnails: ThumbnailConfig = field(default_factory=ThumbnailConfig)
+    image_cache_bytes: int = 512 * 1024 * 1024
+    process_chunk_size: int = 64
     data_dir: str = os.path.join("data", "images")
     ranking_output: str = os.path.join("output", "ranking.json")
+    ranking_ndjson_output: str = os.path.join("output", "ranking.ndjson")  # empty = not written
+    ranking_parquet_output: str = os.path.join("output", "ranking.parquet")  # empty = not written
     html_output: str = os.path.join("output", "index.html")
+    html_page_size: int = 0  # >0 = paged report with a client-side filterable index
 
     @staticmethod
     def from_env() -> "PipelineConfig":
@@ -91,14 +193,80 @@ class PipelineConfig:
                 scroll_wait_min=float(os.getenv("SCRAPER_SCROLL_WAIT_MIN", "1.2")),
                 scroll_wait_max=float(os.getenv("SCRAPER_SCROLL_WAIT_MAX", "2.4")),
                 scroll_step=int(os.getenv("SCRAPER_SCROLL_STEP", "300")),
+                incremental=os.getenv("SCRAPER_INCREMENTAL", "false").lower() == "true",
+                known_ids_path=os.getenv("SCRAPER_KNOWN_IDS_PATH", os.path.join("data", "known_ad_ids.json")),
+                known_stop_after=int(os.getenv("SCRAPER_KNOWN_STOP_AFTER", "5")),
+                parallel_contexts=int(os.getenv("SCRAPER_PARALLEL_CONTEXTS", "1")),
+                max_concurrent_pages=int(os.getenv("SCRAPER_MAX_CONCURRENT_PAGES", "0")),
+                min_page_interval=float(os.getenv("SCRAPER_MIN_PAGE_INTERVAL", "5")),
+                capture_images=os.getenv("SCRAPER_CAPTURE_IMAGES", "false").lower() == "true",
+                capture_max_mb=int(os.getenv("SCRAPER_CAPTURE_MAX_MB", "256")),
+                block_unused_requests=os.getenv("SCRAPER_BLOCK_UNUSED", "false").lower() == "true",
+                batch_extract=os.getenv("SCRAPER_BATCH_EXTRACT", "true").lower() == "true",
             ),
             storage=StorageConfig(
                 supabase_url=os.getenv("SUPABASE_URL"),
                 supabase_key=os.getenv("SUPABASE_KEY"),
+                backend=os.getenv("STORAGE_BACKEND", "supabase").lower(),
+                sqlite_path=os.getenv("SQLITE_PATH", os.path.join("data", "pipeline.sqlite")),
                 table=os.getenv("SUPABASE_TABLE", "ads"),
                 page_table=os.getenv("SUPABASE_PAGE_TABLE", "pages"),
+                chunk_size=int(os.getenv("SUPABASE_CHUNK_SIZE", "500")),
+                max_in_flight=int(os.getenv("SUPABASE_MAX_IN_FLIGHT", "3")),
+                gzip=os.getenv("SUPABASE_GZIP", "false").lower() == "true",
+                retries=int(os.getenv("SUPABASE_RETRIES", "3")),
+                timeout=float(os.getenv("SUPABASE_TIMEOUT", "30")),
+                fingerprint_path=os.getenv(
+                    "SUPABASE_FINGERPRINT_PATH", os.path.join("data", "upsert_fingerprints.sqlite")
+                ),
+                fingerprint_max_age_days=float(os.getenv("SUPABASE_FINGERPRINT_MAX_AGE_DAYS", "7")),
+            ),
+            stream=StreamConfig(
+                enabled=os.getenv("PIPELINE_STREAMING", "false").lower() == "true",
+                queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", "32")),
+                download_workers=int(os.getenv("PIPELINE_DOWNLOAD_WORKERS", "4")),
+                ocr_workers=int(os.getenv("PIPELINE_OCR_WORKERS", "2")),
+                analysis_workers=int(os.getenv("PIPELINE_ANALYSIS_WORKERS", "2")),
+            ),
+            download=DownloadConfig(
+                workers=int(os.getenv("DOWNLOAD_WORKERS", "8")),
+                retries=int(os.getenv("DOWNLOAD_RETRIES", "3")),
+                backoff_base=float(os.getenv("DOWNLOAD_BACKOFF_BASE", "1.0")),
+                timeout=float(os.getenv("DOWNLOAD_TIMEOUT", "30")),
+            ),
+            ocr=OCRConfig(workers=int(os.getenv("OCR_WORKERS", "0"))),
+            analysis=AnalysisConfig(
+                person_max_side=int(os.getenv("PERSON_MAX_SIDE", "640")),
+                person_workers=int(os.getenv("PERSON_WORKERS", "4")),
+            ),
+            dedupe=DedupeConfig(
+                text_jaccard=float(os.getenv("DEDUPE_TEXT_JACCARD", "0.8")),
+                shingle_size=int(os.getenv("DEDUPE_SHINGLE_SIZE", "5")),
+                min_shingles=int(os.getenv("DEDUPE_MIN_SHINGLES", "10")),
+                num_perm=int(os.getenv("DEDUPE_NUM_PERM", "128")),
+            ),
+            feature_cache=FeatureCacheConfig(
+                path=os.getenv("FEATURE_CACHE_PATH", os.path.join("data", "feature_cache.sqlite")),
+                max_age_days=int(os.getenv("FEATURE_CACHE_MAX_AGE_DAYS", "30")),
+                max_entries=int(os.getenv("FEATURE_CACHE_MAX_ENTRIES", "100000")),
+            ),
+            trend=TrendConfig(
+                history_path=os.getenv("TREND_HISTORY_PATH", os.path.join("data", "trend_history.npz")),
+                report_output=os.getenv("TREND_REPORT_OUTPUT", os.path.join("output", "trends.json")),
+            ),
+            thumbnails=ThumbnailConfig(
+                output_dir=os.getenv("THUMBNAIL_DIR", os.path.join("output", "thumbs")),
+                widths=[int(width) for width in _parse_list("THUMBNAIL_WIDTHS", ["320", "640"])],
+                workers=int(os.getenv("THUMBNAIL_WORKERS", "4")),
+                webp_quality=int(os.getenv("THUMBNAIL_WEBP_QUALITY", "75")),
+                jpeg_quality=int(os.getenv("THUMBNAIL_JPEG_QUALITY", "80")),
             ),
+            image_cache_bytes=int(os.getenv("IMAGE_CACHE_MB", "512")) * 1024 * 1024,
+            process_chunk_size=int(os.getenv("PIPELINE_CHUNK_SIZE", "64")),
             data_dir=os.getenv("DATA_DIR", os.path.join("data", "images")),
             ranking_output=os.getenv("RANKING_OUTPUT", os.path.join("output", "ranking.json")),
+            ranking_ndjson_output=os.getenv("RANKING_NDJSON_OUTPUT", os.path.join("output", "ranking.ndjson")),
+            ranking_parquet_output=os.getenv("RANKING_PARQUET_OUTPUT", os.path.join("output", "ranking.parquet")),
             html_output=os.getenv("HTML_OUTPUT", os.path.join("output", "index.html")),
+            html_page_size=int(os.getenv("HTML_PAGE_SIZE", "0")),
         )
@@ -2,6 +2,17 @@ from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
 
+@dataclass
+class OCRWord:
+    text: str
+    conf: float
+    # Box coordinates are normalized to 0-1 of the OCR'd image.
+    left: float
+    top: float
+    width: float
+    height: float
+
+
 @dataclass
 class Ad:
     ad_id: str
@@ -11,11 +22,14 @@ class Ad:
     page_name: Optional[str] = None
     call_to_action_type: Optional[str] = None
     image_path: Optional[str] = None
+    content_hash: Optional[str] = None
     ocr_text: Optional[str] = None
+    ocr_words: Optional[List[OCRWord]] = None
     analysis: Optional["ImageAnalysis"] = None
     text_hash: Optional[str] = None
     phash: Optional[int] = None
     tags: List[str] = field(default_factory=list)
+    status: str = "fetched"  # 'fetched' or 'invalid_media'
 
 
 @dataclass
@@ -24,6 +38,10 @@ class ImageAnalysis:
     has_person: bool
     layout_type: str
     pitch: str
+    text_amount: str = "small"  # 'small', 'medium' or 'big'
+    layout_bucket: str = "none"  # vertical text placement: 'top', 'middle', 'bottom', 'spread'
+    cta_present: bool = False
+    number_density: str = "low"  # 'low' or 'high'
     extra: Dict[str, Any] = field(default_factory=dict)
 
 
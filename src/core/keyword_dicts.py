@@ -0,0 +1,142 @@
+import hashlib
+import os
+import re
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DICTS_DIR = os.path.join("data", "dicts")
+
+# Trie sentinels; real keys are single characters.
+_END = "<end>"
+_PREFIX = "<prefix>"
+
+# Word ends inside a match, i.e. where a shorter whole-word term could stop.
+_INNER_WORD_END = re.compile(r"(?<=\w)(?=\W)")
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Regex for every term in the trie, sharing prefixes so cost tracks text length, not term count."""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if len(char) == 1]
+    if _PREFIX in node:
+        branches.append(r"\w*")
+    if not branches:
+        return ""
+    optional = _END in node and _PREFIX not in node
+    if len(branches) == 1 and not optional:
+        return branches[0]
+    return f"(?:{'|'.join(branches)})" + ("?" if optional else "")
+
+
+class KeywordDict:
+    """
+    Keyword -> tag dictionary compiled into one trie-shaped regex.
+
+    Terms match whole words, case-insensitively; a term ending in ``*`` also matches
+    any word it starts (``offer*`` matches "offers"). Overlapping terms all count:
+    "limited time" yields both ``limited time`` and ``limited``. :meth:`hits_many`
+    tags a batch of texts with a single scan over all of them.
+    """
+
+    def __init__(self, entries: Mapping[str, Iterable[str]]) -> None:
+        self._exact: Dict[str, Set[str]] = {}
+        self._prefixes: Dict[str, Set[str]] = {}
+        trie: Dict[str, dict] = {}
+        for term, tags in entries.items():
+            term = " ".join(term.lower().split())
+            prefix = term.endswith("*")
+            term = term.rstrip("*")
+            if not term:
+                continue
+            (self._prefixes if prefix else self._exact).setdefault(term, set()).update(tags)
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[_PREFIX if prefix else _END] = {}
+        self._max_prefix = max(map(len, self._prefixes), default=0)
+        # A lookahead consumes nothing, so a match is tried at every word start, not
+        # just after the previous match; _terms_at recovers shorter terms at each start.
+        self._pattern = re.compile(rf"(?<!\w)(?=({_trie_pattern(trie)})(?!\w))") if trie else None
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._prefixes)
+
+    @classmethod
+    def from_file(cls, path: str) -> "KeywordDict":
+        """Read ``keyword<TAB>tag[,tag...]`` lines; blank lines and ``#`` comments are skipped."""
+        entries: Dict[str, Set[str]] = {}
+        with open(path, "r", encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                term, _, tags = line.partition("\t")
+                if not tags.strip():
+                    logger.warning("Skipping %s:%s without a tag", path, number)
+                    continue
+                entries.setdefault(term, set()).update(tag.strip() for tag in tags.split(",") if tag.strip())
+        return cls(entries)
+
+    def hits(self, text: str) -> Counter:
+        """Number of distinct dictionary terms found in ``text``, per tag."""
+        return self.hits_many([text])[0]
+
+    def hits_many(self, texts: Sequence[str]) -> List[Counter]:
+        results = [Counter() for _ in texts]
+        if self._pattern is None or not texts:
+            return results
+        # Normalized texts joined by a non-word separator, so boundaries never span two texts.
+        normalized = [" ".join(text.lower().split()) for text in texts]
+        starts, offset = [], 0
+        for text in normalized:
+            starts.append(offset)
+            offset += len(text) + 1
+        seen: List[Set[str]] = [set() for _ in texts]
+        for match in self._pattern.finditer("\n".join(normalized)):
+            doc = bisect_right(starts, match.start()) - 1
+            for term, tags in self._terms_at(match.group(1)):
+                if term not in seen[doc]:
+                    seen[doc].add(term)
+                    results[doc].update(tags)
+        return results
+
+    def _terms_at(self, span: str) -> Iterator[Tuple[str, Set[str]]]:
+        """Every term starting where ``span``, the longest match at one position, starts."""
+        # The regex picks the longest alternative, so shorter exact terms ending on an
+        # earlier word boundary inside the span are looked up here.
+        for end in [match.start() for match in _INNER_WORD_END.finditer(span)] + [len(span)]:
+            if span[:end] in self._exact:
+                yield span[:end], self._exact[span[:end]]
+        for length in range(min(len(span), self._max_prefix), 0, -1):
+            if span[:length] in self._prefixes:
+                yield span[:length] + "*", self._prefixes[span[:length]]
+
+
+@lru_cache(maxsize=None)
+def load_keyword_dict(name: str, directory: str = DICTS_DIR) -> KeywordDict:
+    """The ``{directory}/{name}.tsv`` dictionary, compiled once per process."""
+    path = os.path.join(directory, f"{name}.tsv")
+    if not os.path.exists(path):
+        logger.warning("Keyword dictionary %s not found; no %s tags will be assigned", path, name)
+        return KeywordDict({})
+    dictionary = KeywordDict.from_file(path)
+    logger.debug("Loaded %s terms from %s", len(dictionary), path)
+    return dictionary
+
+
+def keyword_dicts_fingerprint(directory: str = DICTS_DIR) -> Optional[str]:
+    """Digest of every dictionary file, so cached tags are recomputed when they change."""
+    if not os.path.isdir(directory):
+        return None
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".tsv"):
+            digest.update(name.encode("utf-8"))
+            with open(os.path.join(directory, name), "rb") as file:
+                digest.update(file.read())
+    return digest.hexdigest()[:12]
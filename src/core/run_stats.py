@@ -0,0 +1,30 @@
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+
+# Spec 7: days with fewer valid ads than this are flagged as reference-only.
+MIN_VALID_ADS = 40
+
+
+@dataclass
+class RunStats:
+    run_date: date
+    n_fetched: int = 0
+    n_valid: int = 0
+    n_unique: int = 0
+    guarantee_count: int = 0
+    explore_count: int = 0
+    empty_rate: float = 0.0
+    impr_available_ratio: Optional[float] = None
+    promotion_candidates: List[str] = field(default_factory=list)
+    step_status: Dict[str, str] = field(default_factory=dict)
+    error_summary: Optional[str] = None
+
+    @property
+    def explore_ratio(self) -> float:
+        total = self.guarantee_count + self.explore_count
+        return self.explore_count / total if total else 0.0
+
+    @property
+    def is_reference(self) -> bool:
+        return self.n_valid < MIN_VALID_ADS
@@ -1,7 +1,11 @@
 from collections import Counter
-from typing import Iterable, List, Set
+from typing import Iterable, List, Optional, Sequence, Set
 
 from src.core.ad import Ad, ImageAnalysis
+from src.core.keyword_dicts import load_keyword_dict
+
+# data/dicts/concept_tags.tsv
+CONCEPT_DICT = "concept_tags"
 
 COLOR_TAGS = {
     "red": ["urgent", "sale"],
@@ -15,31 +19,33 @@ COLOR_TAGS = {
 
 
 def _keyword_tags(text: str) -> Set[str]:
-    keywords = {
-        "free": "promotion",
-        "sale": "discount",
-        "limited": "scarcity",
-        "new": "launch",
-        "exclusive": "premium",
-        "bundle": "pack",
-    }
-    lowered = text.lower()
-    tags = {value for key, value in keywords.items() if key in lowered}
-    return tags
-
-
-def generate_concept_tags(ad: Ad, analysis: ImageAnalysis) -> List[str]:
-    tags: Set[str] = set()
-    tags.update(_keyword_tags(ad.creative_body))
-    tags.update(_keyword_tags(ad.ocr_text or ""))
+    return set(load_keyword_dict(CONCEPT_DICT).hits(text))
+
+
+def ad_text(ad: Ad) -> str:
+    """Copy plus on-image text, the input of every keyword dictionary."""
+    return f"{ad.creative_body}\n{ad.ocr_text or ''}"
+
+
+def keyword_tags_many(ads: Sequence[Ad]) -> List[Set[str]]:
+    """Dictionary tags for many ads in one scan over all of their text."""
+    return [set(hits) for hits in load_keyword_dict(CONCEPT_DICT).hits_many([ad_text(ad) for ad in ads])]
+
+
+def generate_concept_tags(ad: Ad, analysis: ImageAnalysis, keyword_tags: Optional[Set[str]] = None) -> List[str]:
+    tags: Set[str] = set(keyword_tags if keyword_tags is not None else _keyword_tags(ad_text(ad)))
 
     for color_tag in COLOR_TAGS.get(analysis.dominant_color, []):
         tags.add(color_tag)
 
     if analysis.has_person:
         tags.add("human-centric")
-    if analysis.layout_type == "text-heavy":
+    if analysis.layout_type == "text-heavy" or analysis.text_amount == "big":
         tags.add("informational")
+    if analysis.cta_present:
+        tags.add("cta")
+    if analysis.number_density == "high":
+        tags.add("number-led")
     if analysis.pitch == "rational":
         tags.add("rational")
     elif analysis.pitch == "emotional":
@@ -49,6 +55,16 @@ def generate_concept_tags(ad: Ad, analysis: ImageAnalysis) -> List[str]:
     return sorted(tags)
 
 
+def person_bucket(analysis: ImageAnalysis) -> str:
+    """Spec 9 person bucket, 0/1/multi; detection is a yes/no, so "multi" is never produced."""
+    return "1" if analysis.has_person else "0"
+
+
+def concept_tag(analysis: ImageAnalysis) -> str:
+    """Coarse concept key from spec 10: ``{color}×{person}×{layout}``."""
+    return f"{analysis.dominant_color}×{person_bucket(analysis)}×{analysis.layout_type}"
+
+
 def summarize_tags(tags: Iterable[str]) -> List[str]:
     counter = Counter(tags)
     return [tag for tag, _ in counter.most_common()]
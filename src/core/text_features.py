@@ -0,0 +1,85 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from src.core.ad import OCRWord
+
+CTA_PATTERN = re.compile(
+    r"\b(shop now|buy now|order now|learn more|sign up|subscribe|get started|book now|"
+    r"apply now|download|install now|get offer|claim|donate|contact us|see more|find out more)\b",
+    re.IGNORECASE,
+)
+
+TEXT_AMOUNT_MEDIUM = 40
+TEXT_AMOUNT_BIG = 150
+NUMBER_DENSITY_HIGH = 0.1
+
+
+@dataclass
+class TextFeatures:
+    text_amount: str
+    layout_bucket: str
+    cta_present: bool
+    number_density: str
+    layout_type: Optional[str] = None  # only known when word boxes are available
+
+
+def text_amount_bucket(text: str) -> str:
+    length = len(text.strip())
+    if length >= TEXT_AMOUNT_BIG:
+        return "big"
+    if length >= TEXT_AMOUNT_MEDIUM:
+        return "medium"
+    return "small"
+
+
+def number_density_bucket(text: str) -> str:
+    chars = [char for char in text if not char.isspace()]
+    if not chars:
+        return "low"
+    digits = sum(1 for char in chars if char.isdigit())
+    return "high" if digits / len(chars) >= NUMBER_DENSITY_HIGH else "low"
+
+
+def cta_present(text: str) -> bool:
+    return CTA_PATTERN.search(text) is not None
+
+
+def layout_bucket(words: Sequence[OCRWord]) -> str:
+    """Classify where text sits vertically, weighting each word by its box height."""
+    if not words:
+        return "none"
+    centers = [word.top + word.height / 2 for word in words]
+    if max(centers) - min(centers) > 0.6:
+        return "spread"
+    total = sum(word.height for word in words) or 1.0
+    mean = sum(center * word.height for center, word in zip(centers, words)) / total
+    if mean < 1 / 3:
+        return "top"
+    if mean > 2 / 3:
+        return "bottom"
+    return "middle"
+
+
+def text_coverage(words: Sequence[OCRWord]) -> float:
+    return min(1.0, sum(word.width * word.height for word in words))
+
+
+def layout_type_from_words(words: Sequence[OCRWord]) -> str:
+    coverage = text_coverage(words)
+    if coverage > 0.25:
+        return "text-heavy"
+    if coverage > 0.08:
+        return "balanced"
+    return "visual"
+
+
+def extract_text_features(text: str, words: Optional[List[OCRWord]]) -> TextFeatures:
+    """Derive every spec section 9 text feature from a single OCR result."""
+    return TextFeatures(
+        text_amount=text_amount_bucket(text),
+        layout_bucket=layout_bucket(words or []),
+        cta_present=cta_present(text),
+        number_density=number_density_bucket(text),
+        layout_type=layout_type_from_words(words) if words is not None else None,
+    )
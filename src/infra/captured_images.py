@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+
+class CapturedImageStore:
+    """
+    Image bodies the browser already received, keyed by URL, for the download stage.
+
+    Bounded by total bytes; the oldest captures are dropped first. Bodies are handed
+    out once via ``pop`` so memory is released as soon as the download stage uses them.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._bodies: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def put(self, url: str, body: bytes) -> None:
+        with self._lock:
+            previous = self._bodies.pop(url, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._bodies[url] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes and self._bodies:
+                _, evicted = self._bodies.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def discard(self, urls: Iterable[str]) -> None:
+        """Drop bodies nobody will ask for, without counting them as misses."""
+        with self._lock:
+            for url in urls:
+                body = self._bodies.pop(url, None)
+                if body is not None:
+                    self._bytes -= len(body)
+
+    def pop(self, url: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._bodies.pop(url, None)
+            if body is None:
+                self.misses += 1
+                return None
+            self._bytes -= len(body)
+            self.hits += 1
+            return body
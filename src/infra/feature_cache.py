@@ -0,0 +1,112 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from src.config import FeatureCacheConfig
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+create table if not exists features (
+    key text primary key,
+    payload text not null,
+    created_at real not null,
+    accessed_at real not null
+);
+create index if not exists features_accessed_at_idx on features (accessed_at);
+"""
+
+
+class FeatureCache:
+    """
+    On-disk store of per-creative feature payloads that survives across runs.
+
+    Entries expire ``max_age_days`` after they were written and the least recently
+    read entries are dropped once the table grows past ``max_entries``. Writes are
+    buffered and committed every ``flush_every`` entries, on ``flush`` and on ``close``.
+    """
+
+    flush_every = 100
+
+    def __init__(self, config: FeatureCacheConfig) -> None:
+        self.config = config
+        Path(os.path.dirname(config.path) or ".").mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(config.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, str, float, float]] = []
+        self.hits = 0
+        self.misses = 0
+        self.evict()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, object]]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        found: Dict[str, Dict[str, object]] = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit.
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"select key, payload from features where key in ({placeholders})", batch
+                ).fetchall()
+                found.update((key, json.loads(payload)) for key, payload in rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "update features set accessed_at = ? where key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Mapping[str, Mapping[str, object]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._pending.extend((key, json.dumps(payload), now, now) for key, payload in items.items())
+            if len(self._pending) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def evict(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            cursor = self._conn.execute(
+                "delete from features where created_at < ?",
+                (time.time() - self.config.max_age_days * 86400,),
+            )
+            expired = cursor.rowcount
+            cursor = self._conn.execute(
+                "delete from features where key in ("
+                " select key from features order by accessed_at desc limit -1 offset ?)",
+                (self.config.max_entries,),
+            )
+            self._conn.commit()
+            if expired or cursor.rowcount:
+                logger.info("Evicted %s expired and %s overflow feature cache entries", expired, cursor.rowcount)
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        self._conn.executemany(
+            "insert or replace into features (key, payload, created_at, accessed_at) values (?, ?, ?, ?)",
+            self._pending,
+        )
+        self._conn.commit()
+        self._pending = []
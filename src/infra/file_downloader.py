@@ -1,26 +1,115 @@
-import os
 import pathlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import DownloadConfig
+from src.infra.captured_images import CapturedImageStore
 from src.interface.image_repository import ImageRepository
+from src.utils.atomic_file import atomic_write
+from src.utils.image_cache import DecodedImageCache
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
 class FileDownloader(ImageRepository):
-    def __init__(self, base_dir: str) -> None:
+    def __init__(
+        self,
+        base_dir: str,
+        config: Optional[DownloadConfig] = None,
+        image_cache: Optional[DecodedImageCache] = None,
+        captured_images: Optional[CapturedImageStore] = None,
+    ) -> None:
         self.base_dir = base_dir
+        self.config = config or DownloadConfig()
+        self.image_cache = image_cache
+        self.captured_images = captured_images
         pathlib.Path(base_dir).mkdir(parents=True, exist_ok=True)
+        # One keep-alive pool shared by every worker thread.
+        pool_size = max(1, self.config.workers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
 
     def download(self, url: str, dest_path: str) -> str:
         if not url:
             raise ValueError("Missing URL for download")
 
-        full_path = dest_path
-        pathlib.Path(os.path.dirname(full_path)).mkdir(parents=True, exist_ok=True)
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        with open(full_path, "wb") as file:
-            file.write(response.content)
-        logger.info("Downloaded snapshot to %s", full_path)
-        return full_path
+        body = self.captured_images.pop(url) if self.captured_images is not None else None
+        if body:
+            # The browser already fetched this creative; skip the second request.
+            self._write_atomic(dest_path, [body])
+            logger.info("Saved captured snapshot to %s", dest_path)
+            return dest_path
+
+        attempts = max(0, self.config.retries) + 1
+        attempt = 1
+        while True:
+            try:
+                self._stream_to_file(url, dest_path)
+                logger.info("Downloaded snapshot to %s", dest_path)
+                return dest_path
+            except requests.RequestException as exc:
+                if attempt >= attempts or not self._is_retryable(exc):
+                    raise
+                delay = self.config.backoff_base * (2 ** (attempt - 1))
+                logger.warning(
+                    "Download attempt %s/%s failed for %s: %s; retrying in %.1fs",
+                    attempt,
+                    attempts,
+                    dest_path,
+                    exc,
+                    delay,
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    def bulk_download(self, items: Iterable[tuple[str, str]]) -> list[Optional[str]]:
+        items = list(items)
+        if not items:
+            return []
+        workers = max(1, min(self.config.workers, len(items)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="download") as pool:
+            paths = list(pool.map(lambda item: self._download_or_none(*item), items))
+        failed = sum(1 for path in paths if path is None)
+        logger.info("Bulk downloaded %s/%s snapshots (%s failed)", len(items) - failed, len(items), failed)
+        return paths
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _download_or_none(self, url: str, dest_path: str) -> Optional[str]:
+        try:
+            return self.download(url, dest_path)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Failed to download %s: %s", dest_path, exc)
+            return None
+
+    def _stream_to_file(self, url: str, dest_path: str) -> None:
+        with self._session.get(url, timeout=self.config.timeout, stream=True) as response:
+            response.raise_for_status()
+            self._write_atomic(dest_path, response.iter_content(chunk_size=self.config.chunk_size))
+
+    def _write_atomic(self, dest_path: str, chunks: Iterable[bytes]) -> None:
+        kept: list[bytes] = []
+        with atomic_write(dest_path, "wb") as file:
+            for chunk in chunks:
+                if chunk:
+                    file.write(chunk)
+                    if self.image_cache is not None:
+                        kept.append(chunk)
+        if self.image_cache is not None:
+            # Decode while the bytes are in memory instead of reading the file back later.
+            self.image_cache.put_bytes(dest_path, b"".join(kept))
+
+    @staticmethod
+    def _is_retryable(exc: requests.RequestException) -> bool:
+        response = getattr(exc, "response", None)
+        if response is None:
+            return True
+        return response.status_code == 429 or response.status_code >= 500
@@ -1,16 +1,175 @@
+import json
+import os
+import queue
 import random
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from playwright.sync_api import Page, sync_playwright
 
 from src.config import ScraperConfig
 from src.core.ad import Ad
+from src.infra.captured_images import CapturedImageStore
 from src.interface.ads_repository import AdsRepository
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Keeps a running tally of rendered cards in ``window.__adCardCounter``. A
+# MutationObserver marks the tally stale whenever the feed changes and recounts at
+# most every 100 ms, so each scroll step only reads a few numbers back. Cards whose
+# Library ID is in ``knownIds`` are excluded from ``fresh`` and feed ``knownRun``,
+# the longest streak of consecutive already-known cards.
+_CARD_COUNTER_SCRIPT = """
+(knownIds) => {
+    if (window.__adCardCounter) return;
+    const known = new Set(knownIds);
+    const state = { count: 0, fresh: 0, knownRun: 0 };
+    const recount = () => {
+        const snapshot = document.evaluate(
+            "//span[contains(text(), 'Library ID')]", document, null,
+            XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        let count = 0, fresh = 0, run = 0, longest = 0;
+        for (let i = 0; i < snapshot.snapshotLength; i++) {
+            const match = /ID:\\s*(\\d+)/.exec(snapshot.snapshotItem(i).textContent || "");
+            if (!match) continue;
+            count++;
+            if (known.has(match[1])) {
+                run++;
+                longest = Math.max(longest, run);
+            } else {
+                fresh++;
+                run = 0;
+            }
+        }
+        if (!count) {
+            count = fresh = document.querySelectorAll("div[data-ad-preview-id], div[role='article']").length;
+        }
+        Object.assign(state, { count, fresh, knownRun: longest });
+    };
+    let timer = null;
+    new MutationObserver(() => {
+        if (timer === null) timer = setTimeout(() => { timer = null; recount(); }, 100);
+    }).observe(document.body, { childList: true, subtree: true });
+    recount();
+    window.__adCardCounter = state;
+}
+"""
+
+# One round trip per scroll step: page height plus the card tally.
+_SCROLL_STATE_SCRIPT = """
+() => Object.assign({ height: document.body.scrollHeight }, window.__adCardCounter || {})
+"""
+
+
+# Extract id, creative image and text for every card in one round trip. Mirrors the
+# per-card fallbacks in _extract_cards/_extract_card_id/_extract_image/_extract_text.
+_EXTRACT_CARDS_SCRIPT = """
+() => {
+    const snapshot = document.evaluate(
+        "//div[contains(@class, 'xh8yej3') and .//span[contains(text(), 'Library ID')]]/..",
+        document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    let cards = [];
+    for (let i = 0; i < snapshot.snapshotLength; i++) cards.push(snapshot.snapshotItem(i));
+    for (const selector of ["div[data-ad-preview-id]", "div[role='article']"]) {
+        if (cards.length) break;
+        cards = Array.from(document.querySelectorAll(selector));
+    }
+
+    const cardId = (card) => {
+        const attr = card.getAttribute("data-ad-preview-id")
+            || card.getAttribute("data-adid")
+            || card.getAttribute("data-ad-id");
+        if (attr) return attr;
+        const span = document.evaluate(
+            ".//span[contains(text(), 'Library ID')]", card, null,
+            XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        const text = span ? (span.innerText || "") : "";
+        return text.includes("ID:") ? text.split("ID:").pop().trim() : null;
+    };
+    const cardImage = (card) => {
+        for (const img of card.querySelectorAll("img")) {
+            if ((img.getAttribute("class") || "").includes("_8nqq")) continue;
+            return img.getAttribute("src") || img.getAttribute("data-src");
+        }
+        return null;
+    };
+    const cardText = (card) => {
+        const nodes = [
+            card.querySelector("[data-ad-text]") || card.querySelector("[role='presentation']"),
+            card.querySelector("div[dir='auto']"),
+        ];
+        for (const node of nodes) {
+            const text = node ? (node.innerText || "").trim() : "";
+            if (text) return text;
+        }
+        return (card.innerText || "").trim();
+    };
+
+    return cards.map((card) => ({ id: cardId(card), image: cardImage(card), text: cardText(card) }));
+}
+"""
+
+# Requests the scraper never uses: fonts, video and tracking beacons.
+_BLOCKED_RESOURCE_TYPES = {"font", "media"}
+_BLOCKED_URL_MARKERS = (
+    "facebook.com/tr",
+    "/ajax/bz",
+    "/ajax/bulk-route-definitions",
+    "/logging/",
+    "connect.facebook.net",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+)
+# Hosts serving ad creatives; other images (icons, sprites) are not worth keeping.
+_CREATIVE_HOST_MARKERS = ("fbcdn.net", "scontent")
+
+# Marks that one browser-context worker has finished.
+_WORKER_DONE = object()
+
+
+class _ScrapeBudget:
+    """Thread-safe count of ads still wanted across all browser contexts."""
+
+    def __init__(self, limit: int) -> None:
+        self._remaining = limit
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return self._remaining
+
+    def claim(self, wanted: int) -> int:
+        with self._lock:
+            granted = max(0, min(wanted, self._remaining))
+            self._remaining -= granted
+            return granted
+
+
+class _PagePacer:
+    """Global page-load budget: at most ``max_concurrent`` loads, starts spaced ``min_interval`` apart."""
+
+    def __init__(self, max_concurrent: int, min_interval: float) -> None:
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+        self.min_interval = min_interval
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self._slots:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start)
+                self._next_start = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
 
 class MetaAdsLibraryScraper(AdsRepository):
     """Scrape the Meta Ads Library web UI with human-like pacing."""
@@ -19,38 +178,160 @@ class MetaAdsLibraryScraper(AdsRepository):
         "https://www.facebook.com/ads/library/?active_status=active&ad_type=all&content_languages[0]=en&country=ALL&is_targeted_country=false&media_type=image_and_meme&search_type=page&view_all_page_id={page_id}"
     )
 
-    def __init__(self, config: ScraperConfig) -> None:
+    def __init__(self, config: ScraperConfig, captured_images: Optional[CapturedImageStore] = None) -> None:
         self.config = config
+        self.captured_images = captured_images
+        self._page_captures: Dict[Page, Set[str]] = {}
         self.new_page_ids = set()
+        self.page_stats: Dict[str, Dict[str, int]] = {}
         self._storage_state_path = Path(config.storage_state_path)
         self._storage_state_path.parent.mkdir(parents=True, exist_ok=True)
+        # Persisted IDs only grow through mark_processed(); IDs scraped this run are
+        # skipped for the rest of the run but retried next time unless they get stored.
+        self._known_ids = self._load_known_ids()
+        self._run_ids: Dict[str, Set[str]] = {}
 
     # -- Public API -----------------------------------------------------
     def fetch_guarantee_ads(self, limit: int) -> List[Ad]:
-        ads: List[Ad] = []
+        return list(self.iter_guarantee_ads(limit))
+
+    def iter_guarantee_ads(self, limit: int) -> Iterator[Ad]:
+        """Yield ads page by page so downstream stages can start before the last scroll."""
+        if self.config.parallel_contexts > 1 and len(self.config.page_ids) > 1:
+            yield from self._iter_parallel(limit)
+            return
+
+        scraped = 0
         with sync_playwright() as playwright:
             browser = self._launch_browser(playwright)
             context = self._build_context(browser)
             page = context.new_page()
+            self._attach_capture(page)
 
             for page_id in self.config.page_ids:
-                if len(ads) >= limit:
+                if scraped >= limit:
                     break
-                ads.extend(self._scrape_page(page, page_id, remaining=limit - len(ads)))
+                for ad in self._scrape_page(page, page_id, remaining=limit - scraped):
+                    scraped += 1
+                    yield ad
                 self._human_pause(page)
 
             context.storage_state(path=str(self._storage_state_path))
             context.close()
             browser.close()
 
-        logger.info("Scraped %s ads across %s pages", len(ads), len(self.config.page_ids))
-        return ads[:limit]
+        logger.info("Scraped %s ads across %s pages", scraped, len(self.config.page_ids))
+
+    def mark_processed(self, ads: Iterable[Ad]) -> None:
+        """Remember the Library IDs of stored ads so incremental runs skip them."""
+        added = 0
+        for ad in ads:
+            # Only real Library IDs are remembered; positional fallbacks are not stable across runs.
+            if ad.page_id and ad.ad_id.isdigit():
+                known = self._known_ids.setdefault(ad.page_id, set())
+                if ad.ad_id not in known:
+                    known.add(ad.ad_id)
+                    added += 1
+        if added:
+            self._save_known_ids()
+        logger.debug("Recorded %s newly processed ad IDs", added)
 
     def fetch_explore_ads(self, limit: int) -> List[Ad]:
         # Web scraping mode does not perform explore discovery; keep the contract.
         self.new_page_ids = set()
         return []
 
+    # -- Parallel contexts ----------------------------------------------
+    def _iter_parallel(self, limit: int) -> Iterator[Ad]:
+        """
+        Scrape pages on several isolated browser contexts at once.
+
+        Each worker thread owns its own sync Playwright instance, browser context,
+        user agent and storage state, and keeps the usual human pause between its own
+        pages. All workers share one ``_PagePacer`` so the combined load rate stays
+        bounded no matter how many contexts run.
+        """
+        workers = min(self.config.parallel_contexts, len(self.config.page_ids))
+        pending: "queue.Queue[str]" = queue.Queue()
+        for page_id in self.config.page_ids:
+            pending.put(page_id)
+        results: "queue.Queue[object]" = queue.Queue()
+        budget = _ScrapeBudget(limit)
+        pacer = _PagePacer(self.config.max_concurrent_pages or workers, self.config.min_page_interval)
+
+        threads = [
+            threading.Thread(
+                target=self._context_worker,
+                args=(idx, pending, results, budget, pacer),
+                name=f"scraper-{idx}",
+                daemon=True,
+            )
+            for idx in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        scraped = 0
+        finished = 0
+        while finished < workers:
+            item = results.get()
+            if item is _WORKER_DONE:
+                finished += 1
+                continue
+            scraped += 1
+            yield item
+
+        logger.info(
+            "Scraped %s ads across %s pages with %s parallel contexts",
+            scraped,
+            len(self.config.page_ids),
+            workers,
+        )
+
+    def _context_worker(
+        self,
+        worker_idx: int,
+        pending: "queue.Queue[str]",
+        results: "queue.Queue[object]",
+        budget: _ScrapeBudget,
+        pacer: _PagePacer,
+    ) -> None:
+        try:
+            with sync_playwright() as playwright:
+                browser = self._launch_browser(playwright)
+                storage_state_path = self._storage_state_for(worker_idx)
+                context = self._build_context(browser, worker_idx, storage_state_path)
+                page = context.new_page()
+                self._attach_capture(page)
+
+                first = True
+                while budget.remaining > 0:
+                    try:
+                        page_id = pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    if not first:
+                        self._human_pause(page)
+                    first = False
+                    with pacer.slot():
+                        ads = self._scrape_page(page, page_id, remaining=budget.remaining)
+                    for ad in ads[: budget.claim(len(ads))]:
+                        results.put(ad)
+
+                context.storage_state(path=str(storage_state_path))
+                context.close()
+                browser.close()
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Scraper context %s failed: %s", worker_idx, exc)
+        finally:
+            results.put(_WORKER_DONE)
+
+    def _storage_state_for(self, worker_idx: int) -> Path:
+        if worker_idx == 0:
+            return self._storage_state_path
+        path = self._storage_state_path
+        return path.with_name(f"{path.stem}.{worker_idx}{path.suffix}")
+
     # -- Helpers --------------------------------------------------------
     def _launch_browser(self, playwright):
         return playwright.chromium.launch(
@@ -62,9 +343,14 @@ class MetaAdsLibraryScraper(AdsRepository):
             ],
         )
 
-    def _build_context(self, browser):
-        user_agent = random.choice(self.config.user_agents)
-        storage_state = str(self._storage_state_path) if self._storage_state_path.exists() else None
+    def _build_context(self, browser, worker_idx: Optional[int] = None, storage_state_path: Optional[Path] = None):
+        if worker_idx is None:
+            user_agent = random.choice(self.config.user_agents)
+        else:
+            # Parallel contexts rotate through the pool so concurrent sessions differ.
+            user_agent = self.config.user_agents[worker_idx % len(self.config.user_agents)]
+        storage_state_path = storage_state_path or self._storage_state_path
+        storage_state = str(storage_state_path) if storage_state_path.exists() else None
         context = browser.new_context(
             user_agent=user_agent,
             viewport={"width": self.config.viewport_width, "height": self.config.viewport_height},
@@ -72,9 +358,59 @@ class MetaAdsLibraryScraper(AdsRepository):
             timezone_id=self.config.timezone,
             storage_state=storage_state,
         )
+        if self.config.block_unused_requests:
+            context.route("**/*", self._route_request)
         logger.info("Using UA=%s, locale=%s, timezone=%s", user_agent, self.config.locale, self.config.timezone)
         return context
 
+    @staticmethod
+    def _route_request(route) -> None:
+        request = route.request
+        if request.resource_type in _BLOCKED_RESOURCE_TYPES or any(
+            marker in request.url for marker in _BLOCKED_URL_MARKERS
+        ):
+            route.abort()
+        else:
+            route.continue_()
+
+    def _attach_capture(self, page: Page) -> None:
+        """
+        Keep creative image bodies as the page loads them so they need no second request.
+
+        Bodies go straight into the byte-budgeted shared store; the page only tracks
+        which URLs it put there, so a long scroll cannot grow past ``capture_max_mb``.
+        """
+        store = self.captured_images
+        if store is None:
+            return
+        captured: Set[str] = set()
+        # Keyed by the page itself, not id(page), which can be reused once a page is gone.
+        self._page_captures[page] = captured
+
+        def _on_response(response) -> None:
+            try:
+                if response.request.resource_type != "image" or not response.ok:
+                    return
+                if not any(marker in response.url for marker in _CREATIVE_HOST_MARKERS):
+                    return
+                store.put(response.url, response.body())
+                captured.add(response.url)
+            except Exception as exc:  # noqa: BLE001
+                logger.debug("Could not capture image response %s: %s", response.url, exc)
+
+        page.on("response", _on_response)
+        page.on("close", lambda closed: store.discard(self._page_captures.pop(closed, ())))
+
+    def _hand_over_captures(self, page: Page, ads: List[Ad]) -> None:
+        captured = self._page_captures.get(page)
+        if captured is None or self.captured_images is None:
+            return
+        wanted = {ad.snapshot_url for ad in ads}
+        logger.info("Captured %s/%s creative images from the browser", len(captured & wanted), len(ads))
+        # Images of skipped or unextracted cards are not needed any more.
+        self.captured_images.discard(captured - wanted)
+        captured.clear()
+
     def _scrape_page(self, page: Page, page_id: str, remaining: int) -> List[Ad]:
         url = self.base_url.format(page_id=page_id)
         logger.info("Accessing URL: %s", url)
@@ -93,28 +429,138 @@ class MetaAdsLibraryScraper(AdsRepository):
             logger.info("No ads found immediately for %s (or timeout waiting for selector)", page_id)
 
         page.wait_for_timeout(random.uniform(2000, 4000))
-        self._slow_scroll(page)
-        cards = self._extract_cards(page)
+        known = self._run_ids.get(page_id)
+        if known is None:
+            known = self._run_ids[page_id] = set(self._known_ids.get(page_id, ()))
+        self._slow_scroll(page, page_id, remaining, known if self.config.incremental else None)
+
+        ads: Optional[List[Ad]] = None
+        if self.config.batch_extract:
+            ads, seen = self._extract_ads_batched(page, page_id, remaining, known)
+        if ads is None:
+            ads, seen = self._extract_ads_per_card(page, page_id, remaining, known)
+        known.update(ad.ad_id for ad in ads if ad.ad_id.isdigit())
+        self._hand_over_captures(page, ads)
+        self.page_stats.setdefault(page_id, {}).update({"new": len(ads), "seen": seen})
+        logger.info("Page %s yielded %s ads (requested %s, already seen %s)", page_id, len(ads), remaining, seen)
+        return ads
+
+    def _extract_ads_batched(
+        self, page: Page, page_id: str, remaining: int, known: Set[str]
+    ) -> Tuple[Optional[List[Ad]], int]:
+        """Build ads from one in-page script call; returns ``None`` ads if the script fails."""
+        started = time.monotonic()
+        try:
+            cards = page.evaluate(_EXTRACT_CARDS_SCRIPT)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Batched card extraction failed on %s, falling back to per-card: %s", page_id, exc)
+            return None, 0
 
         ads: List[Ad] = []
+        seen = 0
         for idx, card in enumerate(cards):
             if len(ads) >= remaining:
                 break
-            ad = self._extract_ad_from_card(card, page_id=page_id, fallback_idx=idx)
+            ad_id = card.get("id")
+            if self.config.incremental and ad_id in known:
+                seen += 1
+                continue
+            snapshot_url = card.get("image")
+            creative_body = card.get("text") or ""
+            if not snapshot_url and not creative_body:
+                continue
+            ads.append(
+                Ad(
+                    ad_id=str(ad_id or f"{page_id}-{idx+1}"),
+                    creative_body=creative_body,
+                    snapshot_url=snapshot_url or "",
+                    page_id=page_id,
+                )
+            )
+        logger.debug("Extracted %s cards on %s in %.2fs", len(cards), page_id, time.monotonic() - started)
+        return ads, seen
+
+    def _extract_ads_per_card(
+        self, page: Page, page_id: str, remaining: int, known: Set[str]
+    ) -> Tuple[List[Ad], int]:
+        ads: List[Ad] = []
+        seen = 0
+        for idx, card in enumerate(self._extract_cards(page)):
+            if len(ads) >= remaining:
+                break
+            ad_id = self._extract_card_id(card)
+            if self.config.incremental and ad_id in known:
+                seen += 1
+                continue
+            ad = self._extract_ad_from_card(card, page_id=page_id, fallback_idx=idx, ad_id=ad_id)
             if ad:
                 ads.append(ad)
-        logger.info("Page %s yielded %s ads (requested %s)", page_id, len(ads), remaining)
-        return ads
+        return ads, seen
 
-    def _slow_scroll(self, page: Page) -> None:
+    def _slow_scroll(self, page: Page, page_id: str, remaining: int, known: Optional[Set[str]] = None) -> None:
+        """
+        Scroll until ``remaining`` usable cards are rendered, the feed stops growing or,
+        when ``known`` is given, a run of already-scraped ads shows up.
+        """
+        started = time.monotonic()
+        page.evaluate(_CARD_COUNTER_SCRIPT, sorted(known) if known else [])
         last_height = 0
+        last_count = 0
+        steps = 0
+        reason = "end of feed"
         while True:
+            state = page.evaluate(_SCROLL_STATE_SCRIPT)
+            count = state.get("count", 0)
+            # In incremental mode only unseen cards count towards the budget.
+            available = state.get("fresh", 0) if known else count
+            if steps:
+                logger.debug("Scroll step %s on %s: %s cards (+%s)", steps, page_id, count, count - last_count)
+            if available >= remaining:
+                reason = "enough cards"
+                break
+            if known and state.get("knownRun", 0) >= self.config.known_stop_after:
+                reason = f"{self.config.known_stop_after} consecutive known ads"
+                break
+            if steps and state.get("height") == last_height:
+                break
+            last_height = state.get("height")
+            last_count = count
             page.evaluate(f"window.scrollBy(0, {self.config.scroll_step})")
             page.wait_for_timeout(random.uniform(self.config.scroll_wait_min * 1000, self.config.scroll_wait_max * 1000))
-            height = page.evaluate("document.body.scrollHeight")
-            if height == last_height:
-                break
-            last_height = height
+            steps += 1
+        elapsed = time.monotonic() - started
+        self.page_stats.setdefault(page_id, {}).update({"scroll_steps": steps, "cards": count})
+        logger.info(
+            "Scrolled %s in %s steps, %.1fs (%s cards, %.1f per step; stopped on %s)",
+            page_id,
+            steps,
+            elapsed,
+            count,
+            count / steps if steps else float(count),
+            reason,
+        )
+
+    def _load_known_ids(self) -> Dict[str, Set[str]]:
+        path = self.config.known_ids_path
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable known-ID file %s: %s", path, exc)
+            return {}
+        return {page_id: set(ids) for page_id, ids in data.items()}
+
+    def _save_known_ids(self) -> None:
+        path = self.config.known_ids_path
+        if not path:
+            return
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({page_id: sorted(ids) for page_id, ids in self._known_ids.items()}, file)
+        os.replace(tmp_path, path)
 
     def _extract_cards(self, page: Page):
         # Use XPath to find the parent container of the header div
@@ -137,7 +583,7 @@ class MetaAdsLibraryScraper(AdsRepository):
                 return cards
         return []
 
-    def _extract_ad_from_card(self, card, page_id: str, fallback_idx: int) -> Ad | None:
+    def _extract_card_id(self, card) -> Optional[str]:
         ad_id = (
             card.get_attribute("data-ad-preview-id")
             or card.get_attribute("data-adid")
@@ -155,7 +601,9 @@ class MetaAdsLibraryScraper(AdsRepository):
                         ad_id = text.split("ID:")[-1].strip()
             except Exception:
                 pass
+        return ad_id or None
 
+    def _extract_ad_from_card(self, card, page_id: str, fallback_idx: int, ad_id: Optional[str]) -> Ad | None:
         if not ad_id:
             ad_id = f"{page_id}-{fallback_idx+1}"
 
@@ -1,28 +1,259 @@
+import asyncio
+import json
+import time
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
 import requests
-from typing import Dict, Iterable, List, Optional, Set
+from requests.adapters import HTTPAdapter
 
 from src.config import MetaApiConfig
 from src.core.ad import Ad
+from src.infra.meta_api_cache import build_transport
 from src.interface.ads_repository import AdsRepository
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+AD_FIELDS = "id,page_id,page_name,creative{body,image_url},call_to_action_type"
+
+# Graph API error codes meaning "slow down" even when the HTTP status is not 429.
+_RATE_LIMIT_CODES = {4, 17, 32, 613} | set(range(80000, 80015))
+
+
+class MetaApiError(RuntimeError):
+    pass
+
+
+class _UsageThrottle:
+    """
+    Shared pacing for every request of one client.
+
+    Graph API responses report how much of the app / business quota has been used.
+    Past ``slowdown_pct`` each response pushes the next request back proportionally,
+    up to ``max_delay`` at 100%; an explicit "regain access" estimate or a rate-limit
+    error pauses every task until it expires.
+    """
+
+    def __init__(self, slowdown_pct: float, max_delay: float) -> None:
+        self.slowdown_pct = slowdown_pct
+        self.max_delay = max_delay
+        self._resume_at = 0.0
+
+    async def wait(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        usage, regain_minutes = _parse_usage(headers)
+        if regain_minutes > 0:
+            logger.warning("Meta API quota exhausted; pausing for %s min", regain_minutes)
+            self.pause(regain_minutes * 60)
+            return
+        if usage <= self.slowdown_pct:
+            return
+        span = max(1.0, 100.0 - self.slowdown_pct)
+        delay = min(1.0, (usage - self.slowdown_pct) / span) * self.max_delay
+        logger.debug("Meta API usage at %.0f%%; spacing requests by %.1fs", usage, delay)
+        self.pause(delay)
+
+
+def _parse_usage(headers: Mapping[str, str]) -> Tuple[float, float]:
+    """Return the highest usage percentage and regain-access estimate (minutes) in ``headers``."""
+    usage = 0.0
+    regain = 0.0
+    buckets: List[Mapping[str, object]] = []
+    for name in ("x-app-usage", "x-ad-account-usage"):
+        payload = _load_header(headers, name)
+        if isinstance(payload, dict):
+            buckets.append(payload)
+    business = _load_header(headers, "x-business-use-case-usage")
+    if isinstance(business, dict):
+        for entries in business.values():
+            if isinstance(entries, list):
+                buckets.extend(entry for entry in entries if isinstance(entry, dict))
+    for bucket in buckets:
+        for key in ("call_count", "total_cputime", "total_time", "acc_id_util_pct"):
+            value = bucket.get(key)
+            if isinstance(value, (int, float)):
+                usage = max(usage, float(value))
+        value = bucket.get("estimated_time_to_regain_access")
+        if isinstance(value, (int, float)):
+            regain = max(regain, float(value))
+    return usage, regain
+
+
+def _load_header(headers: Mapping[str, str], name: str) -> object:
+    raw = headers.get(name)
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+class AsyncMetaApi:
+    """
+    Ad Library client that runs search terms and page-ID batches concurrently.
+
+    Blocking ``requests`` calls run in worker threads over one pooled session, at most
+    ``max_concurrency`` at a time. Guarantee page IDs are sent ``page_id_batch_size``
+    per request, as many as the API accepts in ``search_page_ids``. With
+    ``cache_mode`` set, responses go through a record/replay store (see
+    :class:`~src.infra.meta_api_cache.CachingTransport`).
+    """
 
-class MetaApi(AdsRepository):
     base_url = "https://graph.facebook.com/v18.0"
 
     def __init__(self, config: MetaApiConfig) -> None:
         self.config = config
         if not config.access_token:
             logger.warning("Meta access token missing; API calls will fail.")
+        pool_size = max(1, config.max_concurrency)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        self._transport = build_transport(session, config.cache_mode, config.cache_path, config.cache_ttl_hours)
+        self._throttle = _UsageThrottle(config.usage_slowdown_pct, config.max_throttle_delay)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.new_page_ids: Set[str] = set()
+
+    def close(self) -> None:
+        self._transport.close()
+
+    async def fetch_guarantee_ads(self, limit: int) -> List[Ad]:
+        page_ids = self.config.guarantee_page_ids
+        if not page_ids:
+            logger.warning("No guarantee page IDs configured")
+            return []
+        size = max(1, self.config.page_id_batch_size)
+        batches = [page_ids[start:start + size] for start in range(0, len(page_ids), size)]
+        cursors: List[Tuple[str, Optional[Dict[str, object]]]] = [
+            (
+                f"{self.base_url}/ads_archive",
+                {
+                    "fields": AD_FIELDS,
+                    "ad_delivery_mode": "GUARANTEE",
+                    "search_page_ids": ",".join(batch),
+                    "ad_reached_countries": self.config.ad_reached_countries,
+                    "limit": min(limit, self.config.page_size),
+                },
+            )
+            for batch in batches
+        ]
+        collected: List[List[Ad]] = [[] for _ in batches]
+        remaining = limit
+        active = list(range(len(batches)))
+        rounds = 0
+        # Page through all batches in lockstep and fill the budget in batch order, so the
+        # result does not depend on which request happens to finish first.
+        while active and remaining > 0:
+            pages = await asyncio.gather(*(self._get_json(*cursors[idx]) for idx in active))
+            rounds += 1
+            still_active: List[int] = []
+            for idx, data in zip(active, pages):
+                items, next_url = _page_items(data)
+                ads = self._extract_ads(items, remaining)
+                remaining -= len(ads)
+                collected[idx].extend(ads)
+                if next_url:
+                    cursors[idx] = (next_url, None)  # next already includes cursor & params
+                    still_active.append(idx)
+            active = still_active
+        ads = [ad for batch in collected for ad in batch]
+        logger.info(
+            "Fetched %s guarantee ads over %s page-ID batches in %s paging rounds", len(ads), len(batches), rounds
+        )
+        return ads
+
+    async def fetch_explore_ads(self, limit: int) -> List[Ad]:
+        terms = self.config.explore_search_terms
+        per_term = max(1, limit // max(1, len(terms)))
+        results = await asyncio.gather(
+            *(
+                self._fetch_ads(
+                    {
+                        "fields": AD_FIELDS,
+                        "ad_delivery_mode": "EXPLORE",
+                        "search_terms": term,
+                        "ad_reached_countries": self.config.ad_reached_countries,
+                    },
+                    limit=per_term,
+                )
+                for term in terms
+            )
+        )
+        ads = [ad for batch in results for ad in batch][:limit]
+        self.new_page_ids = {ad.page_id for ad in ads if ad.page_id}
+        logger.info("Explore discovered %s unique page_ids", len(self.new_page_ids))
+        return ads
+
+    async def _fetch_ads(self, params: Dict[str, object], limit: int) -> List[Ad]:
+        ads: List[Ad] = []
+        next_url: Optional[str] = f"{self.base_url}/ads_archive"
+        next_params: Optional[Dict[str, object]] = {**params, "limit": min(limit, self.config.page_size)}
+
+        while next_url and len(ads) < limit:
+            data = await self._get_json(next_url, next_params)
+            items, next_url = _page_items(data)
+            ads.extend(self._extract_ads(items, limit - len(ads)))
+            next_params = None  # next already includes cursor & params
+            if next_url:
+                logger.debug("Following paging link for next batch")
+        logger.info("Fetched %s ads with params=%s", len(ads), params)
+        return ads
+
+    async def _get_json(self, url: str, params: Optional[Dict[str, object]]) -> Dict[str, object]:
+        attempts = max(0, self.config.max_retries) + 1
+        attempt = 1
+        while True:
+            await self._throttle.wait()
+            async with self._limiter():
+                try:
+                    response = await asyncio.to_thread(self._send, url, params)
+                except requests.RequestException as exc:
+                    response = None
+                    failure = str(exc)
+            if response is not None:
+                self._throttle.observe(response.headers)
+                data = _json_or_none(response)
+                if response.ok:
+                    return data if isinstance(data, dict) else {}
+                failure = f"HTTP {response.status_code}: {_error_message(data) or response.text[:200]}"
+                if not _is_retryable(response, data):
+                    raise MetaApiError(failure)
+            if attempt >= attempts:
+                raise MetaApiError(f"Giving up after {attempts} attempts: {failure}")
+            delay = _retry_after(response) or self.config.backoff_base * (2 ** (attempt - 1))
+            logger.warning("Meta API attempt %s/%s failed (%s); retrying in %.1fs", attempt, attempts, failure, delay)
+            # Rate limits are per app, so every in-flight task backs off together.
+            self._throttle.pause(delay)
+            attempt += 1
+
+    def _send(self, url: str, params: Optional[Dict[str, object]]) -> requests.Response:
+        return self._transport.get(url, params, self._headers(), self.config.timeout)
 
     def _headers(self) -> Dict[str, str]:
         return {"Authorization": f"Bearer {self.config.access_token}"}
 
+    def _limiter(self) -> asyncio.Semaphore:
+        # Semaphores bind to the loop they first wait on; the sync facade runs a new loop per call.
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(max(1, self.config.max_concurrency))
+            self._semaphore_loop = loop
+        return self._semaphore
+
     def _extract_ads(self, items: Iterable[Dict[str, object]], remaining: int) -> List[Ad]:
         ads: List[Ad] = []
         for item in items:
+            if remaining <= 0:
+                break
             creative = item.get("creative", {}) or {}
             snapshot_url = creative.get("image_url") or creative.get("thumbnail_url") or ""
             ads.append(
@@ -36,60 +267,59 @@ class MetaApi(AdsRepository):
                 )
             )
             remaining -= 1
-            if remaining == 0:
-                break
         return ads
 
-    def _fetch_ads(self, params: Dict[str, object], limit: int) -> List[Ad]:
-        ads: List[Ad] = []
-        remaining = limit
-        next_url: Optional[str] = f"{self.base_url}/ads_archive"
-        next_params: Optional[Dict[str, object]] = {**params, "limit": min(limit, self.config.page_size)}
 
-        while next_url and remaining > 0:
-            response = requests.get(next_url, headers=self._headers(), params=next_params, timeout=20)
-            response.raise_for_status()
-            data = response.json()
-            items = data.get("data", []) if isinstance(data, dict) else []
-            ads.extend(self._extract_ads(items, remaining))
-            remaining = max(0, limit - len(ads))
-            paging = data.get("paging", {}) if isinstance(data, dict) else {}
-            next_url = paging.get("next") if isinstance(paging, dict) else None
-            next_params = None  # next already includes cursor & params
-            if next_url:
-                logger.debug("Following paging link for next batch")
-        logger.info("Fetched %s ads with params=%s", len(ads), params)
-        return ads
+def _page_items(data: object) -> Tuple[List[Dict[str, object]], Optional[str]]:
+    items = data.get("data", []) if isinstance(data, dict) else []
+    paging = data.get("paging", {}) if isinstance(data, dict) else {}
+    next_url = paging.get("next") if isinstance(paging, dict) else None
+    return items, next_url
+
+
+def _json_or_none(response: requests.Response) -> object:
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def _error_message(data: object) -> Optional[str]:
+    error = data.get("error") if isinstance(data, dict) else None
+    return error.get("message") if isinstance(error, dict) else None
+
+
+def _is_retryable(response: requests.Response, data: object) -> bool:
+    if response.status_code == 429 or response.status_code >= 500:
+        return True
+    error = data.get("error") if isinstance(data, dict) else None
+    return isinstance(error, dict) and error.get("code") in _RATE_LIMIT_CODES
+
+
+def _retry_after(response: Optional[requests.Response]) -> Optional[float]:
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+class MetaApi(AdsRepository):
+    """Blocking ``AdsRepository`` facade over :class:`AsyncMetaApi`."""
+
+    def __init__(self, config: MetaApiConfig) -> None:
+        self.config = config
+        self._client = AsyncMetaApi(config)
+        self.new_page_ids: Set[str] = set()
 
     def fetch_guarantee_ads(self, limit: int) -> List[Ad]:
-        params: Dict[str, object] = {
-            "fields": "id,page_id,page_name,creative{body,image_url},call_to_action_type",
-            "ad_delivery_mode": "GUARANTEE",
-            "search_page_ids": ",".join(self.config.guarantee_page_ids),
-            "ad_reached_countries": self.config.ad_reached_countries,
-        }
-        return self._fetch_ads(params=params, limit=limit)
+        return asyncio.run(self._client.fetch_guarantee_ads(limit))
 
     def fetch_explore_ads(self, limit: int) -> List[Ad]:
-        ads: List[Ad] = []
-        discovered_pages: Set[str] = set()
-        per_term = max(1, limit // max(1, len(self.config.explore_search_terms)))
+        ads = asyncio.run(self._client.fetch_explore_ads(limit))
+        self.new_page_ids = self._client.new_page_ids
+        return ads
 
-        for term in self.config.explore_search_terms:
-            if len(ads) >= limit:
-                break
-            params = {
-                "fields": "id,page_id,page_name,creative{body,image_url},call_to_action_type",
-                "ad_delivery_mode": "EXPLORE",
-                "search_terms": term,
-                "ad_reached_countries": self.config.ad_reached_countries,
-            }
-            batch = self._fetch_ads(params=params, limit=per_term)
-            ads.extend(batch)
-            for ad in batch:
-                if ad.page_id:
-                    discovered_pages.add(ad.page_id)
-
-        self.new_page_ids: Set[str] = discovered_pages
-        logger.info("Explore discovered %s unique page_ids", len(self.new_page_ids))
-        return ads[:limit]
+    def close(self) -> None:
+        self._client.close()
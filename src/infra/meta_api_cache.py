@@ -0,0 +1,148 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Mapping, Optional, Protocol
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_MODES = ("off", "record", "replay", "refresh")
+
+_SCHEMA = """
+create table if not exists responses (
+    key text primary key,
+    url text not null,
+    status integer not null,
+    body blob not null,
+    fetched_at real not null
+);
+"""
+
+# Paging links echo the token back; it must never be written to disk.
+_ACCESS_TOKEN_RE = re.compile(rb"access_token=[^&\"\\]*&?")
+
+
+class Transport(Protocol):
+    def get(
+        self, url: str, params: Optional[Mapping[str, object]], headers: Mapping[str, str], timeout: float
+    ) -> requests.Response: ...
+
+
+class SessionTransport:
+    """Plain HTTP over a shared ``requests.Session``."""
+
+    def __init__(self, session: requests.Session) -> None:
+        self.session = session
+
+    def get(
+        self, url: str, params: Optional[Mapping[str, object]], headers: Mapping[str, str], timeout: float
+    ) -> requests.Response:
+        return self.session.get(url, headers=dict(headers), params=params, timeout=timeout)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def request_key(url: str, params: Optional[Mapping[str, object]] = None) -> str:
+    """Stable key for a GET: host, path and sorted query (paging cursor included, token excluded)."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query.extend((k, str(v)) for k, v in (params or {}).items())
+    query = sorted((k, v) for k, v in query if k != "access_token")
+    canonical = f"{parts.netloc}{parts.path}?{urlencode(query)}"
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CachingTransport:
+    """
+    Record/replay store for successful API responses, keyed by :func:`request_key`.
+
+    ``record`` always goes to the network and saves what it gets. ``replay`` never
+    does: a request that was not recorded raises ``LookupError``, so replay runs are
+    offline and return byte-identical pages. ``refresh`` serves entries younger than
+    ``ttl_hours`` and re-fetches (and re-records) older or missing ones. Cached
+    responses carry no usage headers, so they never trigger throttling.
+    """
+
+    def __init__(self, inner: Transport, path: str, mode: str = "refresh", ttl_hours: float = 24.0) -> None:
+        if mode not in CACHE_MODES or mode == "off":
+            raise ValueError(f"Unsupported cache mode {mode!r}; expected one of record, replay, refresh")
+        self.inner = inner
+        self.mode = mode
+        self.ttl_seconds = ttl_hours * 3600
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, url: str, params: Optional[Mapping[str, object]], headers: Mapping[str, str], timeout: float
+    ) -> requests.Response:
+        key = request_key(url, params)
+        if self.mode != "record":
+            cached = self._load(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+            if self.mode == "replay":
+                raise LookupError(f"No recorded response for {urlsplit(url).path} (key {key[:12]})")
+
+        response = self.inner.get(url, params, headers, timeout)
+        if response.ok:
+            self._store(key, url, response)
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        close = getattr(self.inner, "close", None)
+        if close is not None:
+            close()
+
+    def _load(self, key: str) -> Optional[requests.Response]:
+        with self._lock:
+            row = self._conn.execute(
+                "select url, status, body, fetched_at from responses where key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        url, status, body, fetched_at = row
+        if self.mode == "refresh" and time.time() - fetched_at > self.ttl_seconds:
+            return None
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.headers = CaseInsensitiveDict({"content-type": "application/json"})
+        response.url = url
+        return response
+
+    def _store(self, key: str, url: str, response: requests.Response) -> None:
+        body = _ACCESS_TOKEN_RE.sub(b"", response.content)
+        clean_url = _ACCESS_TOKEN_RE.sub(b"", url.encode("utf-8")).decode("utf-8")
+        with self._lock:
+            self._conn.execute(
+                "insert or replace into responses (key, url, status, body, fetched_at) values (?, ?, ?, ?, ?)",
+                (key, clean_url, response.status_code, body, time.time()),
+            )
+            self._conn.commit()
+
+
+def build_transport(session: requests.Session, mode: str, path: str, ttl_hours: float) -> Transport:
+    transport = SessionTransport(session)
+    if mode == "off":
+        return transport
+    logger.info("Meta API response cache in %s mode at %s", mode, path)
+    return CachingTransport(transport, path, mode=mode, ttl_hours=ttl_hours)
+
@@ -0,0 +1,156 @@
+"""
+Local stand-in for the Supabase PostgREST endpoint, for measuring upsert throughput offline.
+
+    python -m src.infra.postgrest_stub --rows 20000 --chunk-size 500 --in-flight 3 --gzip
+
+Starts the stub on a free port, upserts synthetic ad rows through ``SupabaseStorage``
+and prints rows/s and the chunk report. ``--latency`` adds a per-request delay to
+mimic a remote database, ``--fail-every`` answers every Nth request with a 503 to
+exercise retries, and rows whose ``id`` starts with ``bad`` are rejected with a 400.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from src.config import StorageConfig
+from src.infra.supabase_storage import SupabaseStorage
+
+
+class PostgrestStub:
+    def __init__(self, latency: float = 0.0, fail_every: int = 0) -> None:
+        self.latency = latency
+        self.fail_every = fail_every
+        self.tables: Dict[str, Dict[str, dict]] = {}
+        self.requests = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "PostgrestStub":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:  # keep benchmark output readable
+                pass
+
+            def do_POST(self) -> None:
+                status, body = stub.handle(self.path, self.headers, self.rfile.read(int(self.headers["Content-Length"])))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def handle(self, path: str, headers, raw: bytes) -> Tuple[int, bytes]:
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += len(raw)
+            request_no = self.requests
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and request_no % self.fail_every == 0:
+            return 503, b'{"message":"injected failure"}'
+        if not path.startswith("/rest/v1/"):
+            return 404, b'{"message":"unknown path"}'
+        if headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        try:
+            rows = json.loads(raw)
+        except ValueError:
+            return 400, b'{"message":"invalid json"}'
+        if not isinstance(rows, list):
+            rows = [rows]
+        if any(str(row.get("id", "")).startswith("bad") for row in rows):
+            return 400, b'{"message":"rejected row"}'
+        table = self.tables.setdefault(path[len("/rest/v1/"):], {})
+        with self._lock:
+            for row in rows:
+                key = str(row.get("id") or row.get("page_id"))
+                table[key] = {**table.get(key, {}), **row}
+        return 201, b""
+
+
+def _synthetic_rows(count: int, bad_every: int) -> list:
+    rows = []
+    for idx in range(count):
+        rows.append(
+            {
+                "id": f"bad-{idx}" if bad_every and idx % bad_every == bad_every - 1 else str(10**15 + idx),
+                "creative_body": "Limited offer on running shoes, free delivery this week only. " * 3,
+                "snapshot_url": f"https://scontent.example/creative/{idx}.jpg",
+                "page_id": str(1000 + idx % 50),
+                "page_name": f"Page {idx % 50}",
+                "call_to_action_type": "SHOP_NOW",
+                "image_path": f"data/images/{idx}.jpg",
+                "ocr_text": "50% OFF\nSHOP NOW",
+                "dominant_color": "red",
+                "has_person": bool(idx % 2),
+                "layout_type": "balanced",
+                "pitch": "discount",
+                "tags": ["red", "discount", "cta"],
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--in-flight", type=int, default=3)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with 503")
+    parser.add_argument("--bad-every", type=int, default=0, help="make every Nth row invalid")
+    args = parser.parse_args()
+
+    stub = PostgrestStub(latency=args.latency, fail_every=args.fail_every).start()
+    config = StorageConfig(
+        supabase_url=stub.url,
+        supabase_key="stub",
+        chunk_size=args.chunk_size,
+        max_in_flight=args.in_flight,
+        gzip=args.gzip,
+        backoff_base=0.1,
+    )
+    rows = _synthetic_rows(args.rows, args.bad_every)
+
+    async def _run():
+        async with SupabaseStorage(config) as storage:
+            return await storage.upsert(rows)
+
+    started = time.perf_counter()
+    report = asyncio.run(_run())
+    elapsed = time.perf_counter() - started
+    stub.stop()
+
+    print(f"rows={args.rows} chunk_size={args.chunk_size} in_flight={args.in_flight} gzip={args.gzip}")
+    print(
+        f"written={report.rows_written} failed={report.rows_failed} chunks={len(report.chunks)} "
+        f"requests={stub.requests} sent={stub.bytes_received / 1e6:.1f}MB"
+    )
+    print(f"elapsed={elapsed:.2f}s throughput={report.rows_written / elapsed:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
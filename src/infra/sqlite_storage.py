@@ -0,0 +1,296 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Iterable, List, Mapping, Sequence, Tuple
+
+from src.config import StorageConfig
+from src.interface.storage_repository import ChunkResult, StorageRepository, UpsertReport
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ``ads`` and ``pages`` mirror schema.sql; the rest are the spec 13 history tables.
+_SCHEMA = """
+create table if not exists ads (
+    id text primary key,
+    creative_body text,
+    snapshot_url text,
+    page_id text,
+    page_name text,
+    call_to_action_type text,
+    image_path text,
+    ocr_text text,
+    dominant_color text,
+    has_person integer,
+    layout_type text,
+    pitch text,
+    tags text,
+    created_at text not null default current_timestamp,
+    updated_at text not null default current_timestamp
+);
+create index if not exists ads_page_id_idx on ads (page_id);
+create index if not exists ads_layout_type_idx on ads (layout_type);
+
+create table if not exists pages (
+    page_id text primary key,
+    created_at text not null default current_timestamp
+);
+
+create table if not exists ads_raw (
+    id integer primary key,
+    fetch_date text not null,
+    ad_id text not null,
+    page_id text,
+    page_name text,
+    body text,
+    title text,
+    description text,
+    reached_countries text,
+    status text not null,
+    unique (fetch_date, ad_id)
+);
+create index if not exists ads_raw_page_date_idx on ads_raw (page_id, fetch_date);
+
+create table if not exists ads_unique (
+    id integer primary key,
+    fetch_date text not null,
+    ad_id text not null,
+    page_id text,
+    image_path text,
+    text_hash text,
+    phash text,
+    dominant_color text,
+    person_bucket text,
+    text_amount_bucket text,
+    layout_bucket text,
+    cta_present integer,
+    number_density_bucket text,
+    concept_tag text,
+    features_json text,
+    unique (fetch_date, ad_id)
+);
+create index if not exists ads_unique_concept_date_idx on ads_unique (concept_tag, fetch_date);
+create index if not exists ads_unique_text_hash_idx on ads_unique (text_hash);
+
+create table if not exists concept_daily (
+    id integer primary key,
+    date text not null,
+    concept_tag text not null,
+    freq integer not null,
+    rate real,
+    persistence real,
+    count_score real,
+    impr_range_raw text,
+    impr_value real,
+    impr_rate real,
+    impr_score real,
+    score_selected_type text,
+    unique (date, concept_tag)
+);
+create index if not exists concept_daily_tag_date_idx on concept_daily (concept_tag, date);
+
+create table if not exists run_log (
+    id integer primary key,
+    date text not null,
+    n_fetched integer,
+    n_valid integer,
+    n_unique integer,
+    guarantee_count integer,
+    explore_count integer,
+    explore_ratio real,
+    empty_rate real,
+    impr_available_ratio real,
+    promotion_candidates_json text,
+    step_status_json text,
+    error_summary text,
+    is_reference integer,
+    created_at text not null default current_timestamp
+);
+create index if not exists run_log_date_idx on run_log (date);
+"""
+
+_ADS_COLUMNS = (
+    "id",
+    "creative_body",
+    "snapshot_url",
+    "page_id",
+    "page_name",
+    "call_to_action_type",
+    "image_path",
+    "ocr_text",
+    "dominant_color",
+    "has_person",
+    "layout_type",
+    "pitch",
+    "tags",
+)
+_RAW_COLUMNS = (
+    "fetch_date",
+    "ad_id",
+    "page_id",
+    "page_name",
+    "body",
+    "title",
+    "description",
+    "reached_countries",
+    "status",
+)
+_UNIQUE_COLUMNS = (
+    "fetch_date",
+    "ad_id",
+    "page_id",
+    "image_path",
+    "text_hash",
+    "phash",
+    "dominant_color",
+    "person_bucket",
+    "text_amount_bucket",
+    "layout_bucket",
+    "cta_present",
+    "number_density_bucket",
+    "concept_tag",
+    "features_json",
+)
+_CONCEPT_COLUMNS = (
+    "date",
+    "concept_tag",
+    "freq",
+    "rate",
+    "persistence",
+    "count_score",
+    "impr_range_raw",
+    "impr_value",
+    "impr_rate",
+    "impr_score",
+    "score_selected_type",
+)
+_RUN_COLUMNS = (
+    "date",
+    "n_fetched",
+    "n_valid",
+    "n_unique",
+    "guarantee_count",
+    "explore_count",
+    "explore_ratio",
+    "empty_rate",
+    "impr_available_ratio",
+    "promotion_candidates_json",
+    "step_status_json",
+    "error_summary",
+    "is_reference",
+)
+
+
+class SQLiteStorage(StorageRepository):
+    """
+    Embedded storage for fully offline runs and local history queries.
+
+    The database runs in WAL mode so readers (notebooks, the trend history) never
+    block a run's writes. Each upsert is one ``executemany`` in one transaction.
+    """
+
+    def __init__(self, config: StorageConfig) -> None:
+        self.config = config
+        Path(os.path.dirname(config.sqlite_path) or ".").mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(config.sqlite_path, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    async def upsert(self, records: Iterable[Mapping[str, object]]) -> UpsertReport:
+        rows = []
+        for record in records:
+            record = dict(record)
+            tags = record.get("tags")
+            if isinstance(tags, (list, tuple)):
+                record["tags"] = ",".join(tags)
+            rows.append(record)
+        return await self._upsert("ads", _ADS_COLUMNS, ("id",), rows, touch="updated_at = current_timestamp")
+
+    async def upsert_page_ids(self, page_ids: Iterable[str]) -> UpsertReport:
+        return await self._upsert("pages", ("page_id",), ("page_id",), [{"page_id": page_id} for page_id in page_ids])
+
+    async def upsert_raw_ads(self, records: Iterable[Mapping[str, object]]) -> UpsertReport:
+        return await self._upsert("ads_raw", _RAW_COLUMNS, ("fetch_date", "ad_id"), records)
+
+    async def upsert_unique_ads(self, records: Iterable[Mapping[str, object]]) -> UpsertReport:
+        return await self._upsert("ads_unique", _UNIQUE_COLUMNS, ("fetch_date", "ad_id"), records)
+
+    async def upsert_concept_daily(self, records: Iterable[Mapping[str, object]]) -> UpsertReport:
+        return await self._upsert("concept_daily", _CONCEPT_COLUMNS, ("date", "concept_tag"), records)
+
+    async def log_run(self, record: Mapping[str, object]) -> None:
+        columns = ", ".join(_RUN_COLUMNS)
+        placeholders = ", ".join("?" * len(_RUN_COLUMNS))
+        values = tuple(record.get(column) for column in _RUN_COLUMNS)
+
+        def _insert() -> None:
+            with self._lock:
+                self._conn.execute(f"insert into run_log ({columns}) values ({placeholders})", values)
+                self._conn.commit()
+
+        await asyncio.to_thread(_insert)
+
+    async def fetch_concept_daily(self, since: date) -> List[Tuple[str, str, int]]:
+        def _select() -> List[Tuple[str, str, int]]:
+            with self._lock:
+                return self._conn.execute(
+                    "select date, concept_tag, freq from concept_daily where date >= ?", (since.isoformat(),)
+                ).fetchall()
+
+        return await asyncio.to_thread(_select)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    async def _upsert(
+        self,
+        table: str,
+        columns: Sequence[str],
+        conflict: Sequence[str],
+        records: Iterable[Mapping[str, object]],
+        touch: str = "",
+    ) -> UpsertReport:
+        rows: List[tuple] = [tuple(record.get(column) for column in columns) for record in records]
+        report = UpsertReport(table)
+        if not rows:
+            return report
+
+        # Missing values keep what is stored, like PostgREST after normalize_record drops them.
+        updates = [
+            f"{column} = coalesce(excluded.{column}, {table}.{column})" for column in columns if column not in conflict
+        ]
+        if touch:
+            updates.append(touch)
+        action = f"do update set {', '.join(updates)}" if updates else "do nothing"
+        sql = (
+            f"insert into {table} ({', '.join(columns)}) values ({', '.join('?' * len(columns))}) "
+            f"on conflict ({', '.join(conflict)}) {action}"
+        )
+
+        def _write() -> float:
+            started = time.monotonic()
+            with self._lock:
+                try:
+                    self._conn.executemany(sql, rows)
+                    self._conn.commit()
+                except sqlite3.Error:
+                    self._conn.rollback()
+                    raise
+            return time.monotonic() - started
+
+        try:
+            elapsed = await asyncio.to_thread(_write)
+        except sqlite3.Error as exc:
+            logger.error("SQLite upsert into %s failed: %s", table, exc)
+            report.chunks.append(ChunkResult(0, len(rows), False, error=str(exc)))
+            return report
+        report.chunks.append(ChunkResult(0, len(rows), True, elapsed=elapsed))
+        logger.info("Upserted %s records into SQLite table %s (%.2fs)", len(rows), table, elapsed)
+        return report
@@ -1,39 +1,67 @@
 import asyncio
-import json
-from typing import Iterable, Mapping
+import gzip
+import time
+from typing import Dict, Iterable, List, Mapping, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
 
 from src.config import StorageConfig
-from src.interface.storage_repository import StorageRepository, normalize_record
+from src.interface.storage_repository import ChunkResult, StorageRepository, UpsertReport, normalize_record
+from src.utils.json_encoding import encode_json
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Statuses where the server rejected the chunk's content (bad row, conflict, too big):
+# retrying as-is cannot help, but smaller chunks can.
+_SPLITTABLE_STATUSES = {400, 409, 413, 422}
+
+
+class _ChunkFailed(Exception):
+    def __init__(self, message: str, status: Optional[int]) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retryable = status is None or status in (408, 429) or status >= 500
+        self.splittable = status in _SPLITTABLE_STATUSES
+
 
 class SupabaseStorage(StorageRepository):
+    """
+    PostgREST upserts sent as ``chunk_size``-row requests, ``max_in_flight`` at a time.
+
+    Each chunk is retried on its own with exponential backoff. A chunk the server
+    rejects as malformed is split in half until the offending rows are isolated, so
+    one bad row no longer fails the rest of the day's records.
+    """
+
     def __init__(self, config: StorageConfig) -> None:
         self.config = config
         if not (config.supabase_url and config.supabase_key):
             logger.warning("Supabase credentials missing; persistence will be skipped.")
+        pool_size = max(1, config.max_in_flight)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
         self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
 
-    async def upsert(self, records: Iterable[Mapping[str, object]]) -> None:
+    async def upsert(self, records: Iterable[Mapping[str, object]]) -> UpsertReport:
         if not (self.config.supabase_url and self.config.supabase_key):
             logger.info("Skipping Supabase upsert due to missing configuration")
-            return
-        await self._upsert_to_table(self.config.table, records)
+            return UpsertReport(self.config.table, skipped=True)
+        return await self._upsert_to_table(self.config.table, records)
 
-    async def upsert_page_ids(self, page_ids: Iterable[str]) -> None:
+    async def upsert_page_ids(self, page_ids: Iterable[str]) -> UpsertReport:
         if not (self.config.supabase_url and self.config.supabase_key):
             logger.info("Skipping Supabase page_id upsert due to missing configuration")
-            return
+            return UpsertReport(self.config.page_table, skipped=True)
         records = ({"page_id": page_id} for page_id in page_ids)
-        await self._upsert_to_table(self.config.page_table, records)
+        return await self._upsert_to_table(self.config.page_table, records)
 
     async def close(self) -> None:
         self._session.close()
 
-    async def _upsert_to_table(self, table: str, records: Iterable[Mapping[str, object]]) -> None:
+    async def _upsert_to_table(self, table: str, records: Iterable[Mapping[str, object]]) -> UpsertReport:
         url = f"{self.config.supabase_url}/rest/v1/{table}"
         headers = {
             "apikey": self.config.supabase_key,
@@ -41,14 +69,107 @@ class SupabaseStorage(StorageRepository):
             "Content-Type": "application/json",
             "Prefer": "resolution=merge-duplicates",
         }
+        if self.config.gzip:
+            headers["Content-Encoding"] = "gzip"
 
         payload = [normalize_record(dict(record)) for record in records]
+        report = UpsertReport(table)
         if not payload:
-            return
+            return report
+
+        started = time.monotonic()
+        size = max(1, self.config.chunk_size)
+        semaphore = asyncio.Semaphore(max(1, self.config.max_in_flight))
+        results = await asyncio.gather(
+            *(
+                self._upsert_chunk(url, headers, payload[start:start + size], start, semaphore)
+                for start in range(0, len(payload), size)
+            )
+        )
+        report.chunks = sorted((chunk for chunk_results in results for chunk in chunk_results), key=lambda c: c.start)
+        elapsed = time.monotonic() - started
+        if report.ok:
+            logger.info(
+                "Upserted %s records into Supabase table %s in %s chunks (%.1fs)",
+                report.rows_written,
+                table,
+                len(report.chunks),
+                elapsed,
+            )
+        else:
+            failed = [chunk for chunk in report.chunks if not chunk.ok]
+            logger.error(
+                "Upserted %s/%s records into Supabase table %s; %s chunks failed (first: rows %s-%s, %s)",
+                report.rows_written,
+                len(payload),
+                table,
+                len(failed),
+                failed[0].start,
+                failed[0].start + failed[0].rows - 1,
+                failed[0].error,
+            )
+        return report
+
+    async def _upsert_chunk(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        rows: List[Mapping[str, object]],
+        start: int,
+        semaphore: asyncio.Semaphore,
+    ) -> List[ChunkResult]:
+        body = encode_json(rows)
+        if self.config.gzip:
+            body = gzip.compress(body, compresslevel=5)
 
-        def _post() -> None:
-            response = self._session.post(url, headers=headers, data=json.dumps(payload), timeout=30)
-            response.raise_for_status()
+        attempts = max(0, self.config.retries) + 1
+        attempt = 1
+        started = time.monotonic()
+        while True:
+            try:
+                async with semaphore:
+                    status = await asyncio.to_thread(self._post, url, headers, body)
+                return [ChunkResult(start, len(rows), True, attempt, status, elapsed=time.monotonic() - started)]
+            except _ChunkFailed as exc:
+                failure = exc
+            if failure.splittable and len(rows) > 1:
+                # Bisect to isolate the rows PostgREST rejects.
+                half = len(rows) // 2
+                halves = await asyncio.gather(
+                    self._upsert_chunk(url, headers, rows[:half], start, semaphore),
+                    self._upsert_chunk(url, headers, rows[half:], start + half, semaphore),
+                )
+                return halves[0] + halves[1]
+            if not failure.retryable or attempt >= attempts:
+                break
+            delay = self.config.backoff_base * (2 ** (attempt - 1))
+            logger.warning(
+                "Upsert chunk at row %s failed (attempt %s/%s): %s; retrying in %.1fs",
+                start,
+                attempt,
+                attempts,
+                failure,
+                delay,
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+        return [
+            ChunkResult(
+                start,
+                len(rows),
+                False,
+                attempt,
+                failure.status,
+                str(failure),
+                elapsed=time.monotonic() - started,
+            )
+        ]
 
-        await asyncio.to_thread(_post)
-        logger.info("Upserted %s records into Supabase table %s", len(payload), table)
+    def _post(self, url: str, headers: Dict[str, str], body: bytes) -> int:
+        try:
+            response = self._session.post(url, headers=headers, data=body, timeout=self.config.timeout)
+        except requests.RequestException as exc:
+            raise _ChunkFailed(str(exc), None) from exc
+        if not response.ok:
+            raise _ChunkFailed(f"HTTP {response.status_code}: {response.text[:200]}", response.status_code)
+        return response.status_code
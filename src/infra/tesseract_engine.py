@@ -1,24 +1,90 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
 import cv2
 import numpy as np
 import pytesseract
 
-from src.interface.ocr_engine import OCREngine
+from src.config import OCRConfig
+from src.core.ad import OCRWord
+from src.interface.ocr_engine import OCREngine, OCRResult, run_ocr
+from src.utils.image_cache import DecodedImageCache
 
 
 class TesseractEngine(OCREngine):
-    def __init__(self) -> None:
+    def __init__(
+        self, ocr_config: Optional[OCRConfig] = None, image_cache: Optional[DecodedImageCache] = None
+    ) -> None:
         self.config = "--oem 3 --psm 6"
+        self.ocr_config = ocr_config or OCRConfig()
+        self.image_cache = image_cache
+        self.workers = self.ocr_config.workers or os.cpu_count() or 1
+        self._pool: Optional[ThreadPoolExecutor] = None
+        if self.workers > 1:
+            # Each worker already owns a core; stop tesseract from spawning its own OpenMP threads.
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
 
     def _preprocess(self, image_path: str) -> 'np.ndarray':
-        image = cv2.imread(image_path)
-        if image is None:
-            raise FileNotFoundError(f"Image not found at {image_path}")
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self.image_cache is not None:
+            handle = self.image_cache.get(image_path)
+            if handle is None:
+                raise FileNotFoundError(f"Image not found at {image_path}")
+            gray = handle.gray
+        else:
+            image = cv2.imread(image_path)
+            if image is None:
+                raise FileNotFoundError(f"Image not found at {image_path}")
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         blurred = cv2.GaussianBlur(gray, (3, 3), 0)
         _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         return thresh
 
     def extract_text(self, image_path: str) -> str:
+        return self.extract(image_path).text
+
+    def extract(self, image_path: str) -> OCRResult:
+        # image_to_data yields text, boxes and confidences from a single tesseract run.
         processed = self._preprocess(image_path)
-        text = pytesseract.image_to_string(processed, config=self.config)
-        return text.strip()
+        data = pytesseract.image_to_data(
+            processed, config=self.config, output_type=pytesseract.Output.DICT
+        )
+        height, width = processed.shape[:2]
+        words: List[OCRWord] = []
+        lines: Dict[Tuple[int, int, int], List[str]] = {}
+        for idx, raw in enumerate(data["text"]):
+            text = (raw or "").strip()
+            conf = float(data["conf"][idx])
+            if not text or conf < 0:
+                continue
+            words.append(
+                OCRWord(
+                    text=text,
+                    conf=conf,
+                    left=data["left"][idx] / width,
+                    top=data["top"][idx] / height,
+                    width=data["width"][idx] / width,
+                    height=data["height"][idx] / height,
+                )
+            )
+            key = (data["block_num"][idx], data["par_num"][idx], data["line_num"][idx])
+            lines.setdefault(key, []).append(text)
+        text = "\n".join(" ".join(tokens) for tokens in lines.values())
+        return OCRResult(image_path, text=text, words=words)
+
+    def extract_texts(self, image_paths: Sequence[str]) -> List[OCRResult]:
+        # pytesseract runs the tesseract binary as a subprocess and OpenCV releases the
+        # GIL, so worker threads keep every core busy without pickling images.
+        if self.workers <= 1 or len(image_paths) <= 1:
+            return super().extract_texts(image_paths)
+        return list(self._get_pool().map(lambda path: run_ocr(self, path), image_paths))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+        return self._pool
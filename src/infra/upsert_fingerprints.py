@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+create table if not exists fingerprints (
+    id text primary key,
+    fingerprint text not null,
+    upserted_at real not null
+);
+"""
+
+
+# Signed CDN URLs are re-signed by Meta without the creative changing; they are still
+# sent with the row, but a new signature alone must not make the row look changed.
+# image_path is derived from the ad ID, so it stays in the fingerprint.
+_VOLATILE_FIELDS = frozenset({"snapshot_url"})
+
+
+def record_fingerprint(record: Mapping[str, object]) -> str:
+    stable = {key: value for key, value in record.items() if key not in _VOLATILE_FIELDS}
+    canonical = json.dumps(stable, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class UpsertFingerprints:
+    """
+    Content fingerprint of the last successfully upserted version of each row, by ``id``.
+
+    A row whose fingerprint is unchanged is not sent again. Fingerprints older than
+    ``max_age_days`` are ignored so rows are still re-sent periodically, which heals
+    rows deleted or edited on the database side.
+    """
+
+    def __init__(self, path: str, max_age_days: float = 7.0) -> None:
+        self.path = path
+        self.max_age_days = max_age_days
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def changed(self, records: Iterable[Mapping[str, object]]) -> List[Tuple[int, str, str]]:
+        """Return ``(index, id, fingerprint)`` for every record that is new or changed."""
+        candidates = [
+            (idx, str(record.get("id")), record_fingerprint(record)) for idx, record in enumerate(records)
+        ]
+        known = self._load([row_id for _, row_id, _ in candidates])
+        return [candidate for candidate in candidates if known.get(candidate[1]) != candidate[2]]
+
+    def commit(self, entries: Iterable[Tuple[str, str]]) -> None:
+        now = time.time()
+        rows = [(row_id, fingerprint, now) for row_id, fingerprint in entries]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "insert or replace into fingerprints (id, fingerprint, upserted_at) values (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _load(self, ids: List[str]) -> Dict[str, str]:
+        cutoff = time.time() - self.max_age_days * 86400
+        found: Dict[str, str] = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit.
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"select id, fingerprint from fingerprints where id in ({placeholders}) and upserted_at >= ?",
+                    [*batch, cutoff],
+                ).fetchall()
+                found.update(rows)
+        return found
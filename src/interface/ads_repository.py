@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Iterable, List
+from typing import Iterable, Iterator, List
 
 from src.core.ad import Ad
 
@@ -13,6 +13,12 @@ class AdsRepository(ABC):
     def fetch_explore_ads(self, limit: int) -> List[Ad]:
         raise NotImplementedError
 
+    def iter_guarantee_ads(self, limit: int) -> Iterator[Ad]:
+        yield from self.fetch_guarantee_ads(limit)
+
+    def mark_processed(self, ads: Iterable[Ad]) -> None:
+        """Called once ``ads`` are safely stored; repositories that skip seen ads record them here."""
+
     def fetch_all(self, limit: int) -> Iterable[Ad]:
         for ad in self.fetch_guarantee_ads(limit):
             yield ad
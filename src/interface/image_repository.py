@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Iterable
+from typing import Iterable, Optional
 
 
 class ImageRepository(ABC):
@@ -7,8 +7,12 @@ class ImageRepository(ABC):
     def download(self, url: str, dest_path: str) -> str:
         raise NotImplementedError
 
-    def bulk_download(self, items: Iterable[tuple[str, str]]) -> list[str]:
-        paths = []
+    def bulk_download(self, items: Iterable[tuple[str, str]]) -> list[Optional[str]]:
+        """Download every ``(url, dest_path)`` pair; failed items come back as ``None`` in input order."""
+        paths: list[Optional[str]] = []
         for url, dest_path in items:
-            paths.append(self.download(url, dest_path))
+            try:
+                paths.append(self.download(url, dest_path))
+            except Exception:  # noqa: BLE001
+                paths.append(None)
         return paths
@@ -1,7 +1,39 @@
+import time
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from src.core.ad import OCRWord
+
+
+@dataclass
+class OCRResult:
+    image_path: str
+    text: str = ""
+    words: Optional[List[OCRWord]] = None  # None when the engine cannot report boxes
+    elapsed: float = 0.0
+    error: Optional[str] = None
 
 
 class OCREngine(ABC):
     @abstractmethod
     def extract_text(self, image_path: str) -> str:
         raise NotImplementedError
+
+    def extract(self, image_path: str) -> OCRResult:
+        """Text plus word boxes from one OCR pass; engines without boxes return text only."""
+        return OCRResult(image_path, text=self.extract_text(image_path))
+
+    def extract_texts(self, image_paths: Sequence[str]) -> List[OCRResult]:
+        """OCR every path, returning results in input order with per-image timing and errors."""
+        return [run_ocr(self, path) for path in image_paths]
+
+
+def run_ocr(engine: OCREngine, image_path: str) -> OCRResult:
+    started = time.perf_counter()
+    try:
+        result = engine.extract(image_path)
+    except Exception as exc:  # noqa: BLE001
+        return OCRResult(image_path, elapsed=time.perf_counter() - started, error=str(exc))
+    result.elapsed = time.perf_counter() - started
+    return result
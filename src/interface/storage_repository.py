@@ -1,20 +1,76 @@
 from abc import ABC, abstractmethod
-from typing import Iterable, Mapping, MutableMapping
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterable, List, Mapping, MutableMapping, Optional, Tuple
+
+
+@dataclass
+class ChunkResult:
+    start: int  # offset of the chunk's first row in the upserted records
+    rows: int
+    ok: bool
+    attempts: int = 1
+    status: Optional[int] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+@dataclass
+class UpsertReport:
+    table: str
+    chunks: List[ChunkResult] = field(default_factory=list)
+    skipped: bool = False
+    unchanged: int = 0  # rows left out because they match the last successful upsert
+    stored_ids: List[str] = field(default_factory=list)  # ids now in the table, filled by save_ads
+
+    @property
+    def rows_sent(self) -> int:
+        return sum(chunk.rows for chunk in self.chunks)
+
+    @property
+    def ok(self) -> bool:
+        return all(chunk.ok for chunk in self.chunks)
+
+    @property
+    def rows_written(self) -> int:
+        return sum(chunk.rows for chunk in self.chunks if chunk.ok)
+
+    @property
+    def rows_failed(self) -> int:
+        return sum(chunk.rows for chunk in self.chunks if not chunk.ok)
 
 
 class StorageRepository(ABC):
     @abstractmethod
-    async def upsert(self, records: Iterable[Mapping[str, object]]) -> None:
+    async def upsert(self, records: Iterable[Mapping[str, object]]) -> UpsertReport:
         raise NotImplementedError
 
     @abstractmethod
-    async def upsert_page_ids(self, page_ids: Iterable[str]) -> None:
+    async def upsert_page_ids(self, page_ids: Iterable[str]) -> UpsertReport:
         raise NotImplementedError
 
     @abstractmethod
     async def close(self) -> None:
         raise NotImplementedError
 
+    # Spec 13 history tables. Backends without them keep these no-op defaults.
+
+    async def upsert_raw_ads(self, records: Iterable[Mapping[str, object]]) -> UpsertReport:
+        return UpsertReport("ads_raw", skipped=True)
+
+    async def upsert_unique_ads(self, records: Iterable[Mapping[str, object]]) -> UpsertReport:
+        return UpsertReport("ads_unique", skipped=True)
+
+    async def upsert_concept_daily(self, records: Iterable[Mapping[str, object]]) -> UpsertReport:
+        return UpsertReport("concept_daily", skipped=True)
+
+    async def log_run(self, record: Mapping[str, object]) -> None:
+        return None
+
+    async def fetch_concept_daily(self, since: date) -> List[Tuple[str, str, int]]:
+        """``(date, concept_tag, freq)`` rows stored for ``since`` and later days."""
+        return []
+
     async def __aenter__(self) -> "StorageRepository":
         return self
 
@@ -1,12 +1,22 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 import numpy as np
-from typing import Iterable, List
+from typing import Iterable, List, Optional, Sequence
 
 from src.core.ad import Ad, ImageAnalysis
+from src.core.keyword_dicts import load_keyword_dict
+from src.core.tagging import ad_text
+from src.core.text_features import extract_text_features
+from src.utils.image_cache import DecodedImageCache, ImageHandle
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# data/dicts/pitch.tsv
+PITCH_DICT = "pitch"
 
 COLOR_BOUNDS = {
     "red": ((0, 50, 50), (10, 255, 255)),
@@ -18,8 +28,9 @@ COLOR_BOUNDS = {
 }
 
 
-def dominant_color_label(image: np.ndarray) -> str:
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+def dominant_color_label(image: np.ndarray, hsv: Optional[np.ndarray] = None) -> str:
+    if hsv is None:
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
     scores = {}
     for label, (lower, upper) in COLOR_BOUNDS.items():
         mask = cv2.inRange(hsv, np.array(lower), np.array(upper))
@@ -32,16 +43,83 @@ def dominant_color_label(image: np.ndarray) -> str:
     return best
 
 
-def detect_person(image: np.ndarray) -> bool:
-    cascade_path = cv2.data.haarcascades + "haarcascade_fullbody.xml"
-    classifier = cv2.CascadeClassifier(cascade_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    detections = classifier.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=3)
-    return len(detections) > 0
+class PersonDetector:
+    """
+    HaarCascade full-body detector that loads the classifier once per worker thread.
+
+    Detection runs on a copy downscaled to ``max_side`` pixels; batches fan out over a
+    thread pool because ``detectMultiScale`` releases the GIL.
+    """
 
+    cascade_name = "haarcascade_fullbody.xml"
 
-def layout_type(image: np.ndarray) -> str:
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    def __init__(self, max_side: int = 640, workers: int = 4) -> None:
+        self.max_side = max_side
+        self.workers = max(1, workers)
+        self._local = threading.local()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def detect(self, gray: np.ndarray) -> bool:
+        detections = self._classifier().detectMultiScale(
+            self._downscale(gray), scaleFactor=1.1, minNeighbors=3
+        )
+        return len(detections) > 0
+
+    def detect_many(self, grays: Sequence[np.ndarray]) -> List[bool]:
+        if self.workers <= 1 or len(grays) <= 1:
+            return [self.detect(gray) for gray in grays]
+        return list(self._get_pool().map(self.detect, grays))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _classifier(self) -> "cv2.CascadeClassifier":
+        classifier = getattr(self._local, "classifier", None)
+        if classifier is None:
+            classifier = cv2.CascadeClassifier(cv2.data.haarcascades + self.cascade_name)
+            self._local.classifier = classifier
+        return classifier
+
+    def _downscale(self, gray: np.ndarray) -> np.ndarray:
+        height, width = gray.shape[:2]
+        longest = max(height, width)
+        if self.max_side <= 0 or longest <= self.max_side:
+            return gray
+        scale = self.max_side / longest
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="person")
+            return self._pool
+
+
+_default_detector: Optional[PersonDetector] = None
+
+
+def _get_default_detector() -> PersonDetector:
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = PersonDetector()
+    return _default_detector
+
+
+def detect_person(
+    image: np.ndarray, gray: Optional[np.ndarray] = None, detector: Optional[PersonDetector] = None
+) -> bool:
+    if gray is None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return (detector or _get_default_detector()).detect(gray)
+
+
+def layout_type(image: np.ndarray, gray: Optional[np.ndarray] = None) -> str:
+    if gray is None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     edges = cv2.Canny(gray, 50, 150)
     density = edges.mean() / 255
     if density > 0.25:
@@ -51,13 +129,12 @@ def layout_type(image: np.ndarray) -> str:
     return "visual"
 
 
-def pitch_type(ad: Ad, layout: str, has_person: bool) -> str:
-    text = (ad.creative_body + " " + (ad.ocr_text or "")).lower()
-    rational_keywords = ["save", "price", "discount", "offer", "plan", "guarantee"]
-    emotional_keywords = ["love", "feel", "happy", "inspire", "dream", "story"]
-
-    rational_hits = sum(1 for k in rational_keywords if k in text)
-    emotional_hits = sum(1 for k in emotional_keywords if k in text)
+def pitch_type(ad: Ad, layout: str, has_person: bool, hits: Optional[Counter] = None) -> str:
+    # Distinct rational/emotional cue words from data/dicts/pitch.tsv.
+    if hits is None:
+        hits = load_keyword_dict(PITCH_DICT).hits(ad_text(ad))
+    rational_hits = hits["rational"]
+    emotional_hits = hits["emotional"]
 
     if rational_hits > emotional_hits:
         return "rational"
@@ -68,28 +145,74 @@ def pitch_type(ad: Ad, layout: str, has_person: bool) -> str:
     return "balanced"
 
 
-def analyze_ads(ads: Iterable[Ad]) -> List[Ad]:
-    analyzed: List[Ad] = []
+def _load_image(path: str, image_cache: Optional[DecodedImageCache]) -> Optional[ImageHandle]:
+    if image_cache is not None:
+        return image_cache.get(path)
+    image = cv2.imread(path)
+    return ImageHandle(path, image) if image is not None else None
+
+
+def _load_ad_image(ad: Ad, image_cache: Optional[DecodedImageCache]) -> Optional[ImageHandle]:
+    if not ad.image_path:
+        logger.warning("Skipping analysis for ad %s due to missing image", ad.ad_id)
+        return None
+    handle = _load_image(ad.image_path, image_cache)
+    if handle is None:
+        logger.error("Failed to load image for ad %s from %s", ad.ad_id, ad.image_path)
+    return handle
+
+
+def _build_analysis(
+    ad: Ad, handle: ImageHandle, person_present: bool, pitch_hits: Optional[Counter] = None
+) -> ImageAnalysis:
+    color = dominant_color_label(handle.bgr, hsv=handle.hsv)
+    features = extract_text_features(ad.ocr_text or "", ad.ocr_words)
+    # OCR word boxes give the layout for free; only engines without boxes need the Canny pass.
+    layout = features.layout_type or layout_type(handle.bgr, gray=handle.gray)
+    pitch = pitch_type(ad, layout, person_present, pitch_hits)
+    return ImageAnalysis(
+        dominant_color=color,
+        has_person=person_present,
+        layout_type=layout,
+        pitch=pitch,
+        text_amount=features.text_amount,
+        layout_bucket=features.layout_bucket,
+        cta_present=features.cta_present,
+        number_density=features.number_density,
+        extra={"image_shape": handle.shape},
+    )
+
+
+def analyze_ad(
+    ad: Ad, image_cache: Optional[DecodedImageCache] = None, detector: Optional[PersonDetector] = None
+) -> Ad:
+    if ad.analysis is not None:
+        return ad
+    handle = _load_ad_image(ad, image_cache)
+    if handle is None:
+        return ad
+    person_present = (detector or _get_default_detector()).detect(handle.gray)
+    ad.analysis = _build_analysis(ad, handle, person_present)
+    return ad
+
+
+def analyze_ads(
+    ads: Iterable[Ad],
+    image_cache: Optional[DecodedImageCache] = None,
+    detector: Optional[PersonDetector] = None,
+) -> List[Ad]:
+    ads = list(ads)
+    loaded = []
     for ad in ads:
-        if not ad.image_path:
-            logger.warning("Skipping analysis for ad %s due to missing image", ad.ad_id)
-            analyzed.append(ad)
-            continue
-        image = cv2.imread(ad.image_path)
-        if image is None:
-            logger.error("Failed to load image for ad %s from %s", ad.ad_id, ad.image_path)
-            analyzed.append(ad)
+        if ad.analysis is not None:
             continue
-        color = dominant_color_label(image)
-        person_present = detect_person(image)
-        layout = layout_type(image)
-        pitch = pitch_type(ad, layout, person_present)
-        ad.analysis = ImageAnalysis(
-            dominant_color=color,
-            has_person=person_present,
-            layout_type=layout,
-            pitch=pitch,
-            extra={"image_shape": image.shape},
-        )
-        analyzed.append(ad)
-    return analyzed
+        handle = _load_ad_image(ad, image_cache)
+        if handle is not None:
+            loaded.append((ad, handle))
+
+    # Person detection dominates per-image cost, so it runs as one batch on the pool.
+    flags = (detector or _get_default_detector()).detect_many([handle.gray for _, handle in loaded])
+    pitch_hits = load_keyword_dict(PITCH_DICT).hits_many([ad_text(ad) for ad, _ in loaded])
+    for (ad, handle), person_present, hits in zip(loaded, flags, pitch_hits):
+        ad.analysis = _build_analysis(ad, handle, person_present, hits)
+    return ads
@@ -0,0 +1,95 @@
+import hashlib
+import json
+from dataclasses import asdict
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from src.config import PipelineConfig
+from src.core.ad import Ad, ImageAnalysis, OCRWord
+from src.core.keyword_dicts import keyword_dicts_fingerprint
+from src.infra.feature_cache import FeatureCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bump whenever OCR, analysis or tagging logic changes so stale entries stop matching.
+FEATURE_VERSION = "4"
+
+
+def feature_cache_version(config: PipelineConfig) -> str:
+    settings = {
+        "version": FEATURE_VERSION,
+        "person_max_side": config.analysis.person_max_side,
+        # Pitch and keyword tags follow the dictionaries, so editing one invalidates them.
+        "keyword_dicts": keyword_dicts_fingerprint(),
+    }
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def file_content_hash(path: str) -> Optional[str]:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _cache_key(ad: Ad, version: str) -> str:
+    # Pitch, CTA and tags also depend on the ad copy, so it is part of the key.
+    copy = f"{ad.creative_body}\x00{ad.call_to_action_type or ''}"
+    copy_hash = hashlib.sha256(copy.encode("utf-8")).hexdigest()[:16]
+    return f"{version}:{ad.content_hash}:{copy_hash}"
+
+
+def _payload(ad: Ad) -> Dict[str, object]:
+    return {
+        "ocr_text": ad.ocr_text,
+        # Word boxes drive layout_type/layout_bucket when the ad is analysed later.
+        "ocr_words": [asdict(word) for word in ad.ocr_words] if ad.ocr_words is not None else None,
+        "phash": ad.phash,
+        "analysis": asdict(ad.analysis) if ad.analysis else None,
+        "tags": ad.tags,
+    }
+
+
+def _apply(ad: Ad, payload: Mapping[str, object]) -> None:
+    ad.ocr_text = payload.get("ocr_text")
+    words = payload.get("ocr_words")
+    ad.ocr_words = [OCRWord(**word) for word in words] if words is not None else None
+    ad.phash = payload.get("phash")
+    analysis = payload.get("analysis")
+    if analysis:
+        ad.analysis = ImageAnalysis(**analysis)
+        ad.tags = list(payload.get("tags") or [])
+
+
+def restore_features(cache: FeatureCache, ads: Iterable[Ad], version: str) -> int:
+    """Fill OCR text, pHash, analysis and tags from earlier runs; returns the number of hits."""
+
+    keyed: Dict[str, List[Ad]] = {}
+    for ad in ads:
+        if not ad.image_path:
+            continue
+        if ad.content_hash is None:
+            ad.content_hash = file_content_hash(ad.image_path)
+        if ad.content_hash:
+            keyed.setdefault(_cache_key(ad, version), []).append(ad)
+
+    found = cache.get_many(keyed)
+    restored = 0
+    for key, payload in found.items():
+        for ad in keyed[key]:
+            _apply(ad, payload)
+            restored += 1
+    if keyed:
+        logger.debug("Feature cache restored %s/%s ads", restored, sum(len(v) for v in keyed.values()))
+    return restored
+
+
+def store_features(cache: FeatureCache, ads: Iterable[Ad], version: str) -> None:
+    # Empty OCR text may be a transient engine failure, so only real results are kept.
+    items = {_cache_key(ad, version): _payload(ad) for ad in ads if ad.content_hash and ad.ocr_text}
+    if items:
+        cache.put_many(items)
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 import hashlib
-from typing import Iterable, List, Tuple
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 import cv2
 import numpy as np
 
+from src.config import DedupeConfig
 from src.core.ad import Ad
+from src.utils.image_cache import DecodedImageCache
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -21,64 +24,304 @@ def _text_hash(ad: Ad) -> str:
     return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
 
 
-def _phash(image_path: str) -> int:
-    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+def _load_gray(image_path: str, image_cache: Optional[DecodedImageCache] = None) -> Optional[np.ndarray]:
+    if image_cache is not None:
+        handle = image_cache.get(image_path)
+        return handle.gray if handle else None
+    return cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+
+
+def phash_many(images: Sequence[np.ndarray]) -> List[int]:
+    """Compute 64-bit DCT pHashes for grayscale images, packing the bits vectorially."""
+    if not len(images):
+        return []
+    low = np.stack([cv2.dct(np.float32(cv2.resize(image, (32, 32))))[:8, :8] for image in images])
+    flat = low.reshape(len(images), 64)
+    bits = flat > np.median(flat, axis=1, keepdims=True)
+    # packbits is MSB-first and the big-endian view keeps the first DCT bit on top,
+    # matching the original bit-by-bit shift loop.
+    packed = np.packbits(bits, axis=1).view(">u8").ravel()
+    return [int(value) for value in packed]
+
+
+def _phash(image_path: str, image_cache: Optional[DecodedImageCache] = None) -> int:
+    image = _load_gray(image_path, image_cache)
     if image is None:
         raise FileNotFoundError(f"Unable to load image at {image_path}")
-    resized = cv2.resize(image, (32, 32))
-    dct = cv2.dct(np.float32(resized))
-    dct_low = dct[:8, :8]
-    median = np.median(dct_low)
-    bits = dct_low > median
-    hash_value = 0
-    for bit in bits.flatten():
-        hash_value = (hash_value << 1) | int(bit)
-    return hash_value
+    return phash_many([image])[0]
+
+
+def phash_ads(ads: Iterable[Ad], image_cache: Optional[DecodedImageCache] = None) -> None:
+    """Fill ``ad.phash`` for every ad with a loadable image in one batch."""
+    pending: List[Ad] = []
+    images: List[np.ndarray] = []
+    for ad in ads:
+        if ad.phash is not None or not ad.image_path:
+            continue
+        image = _load_gray(ad.image_path, image_cache)
+        if image is None:
+            logger.debug("Failed to load image for pHash of ad %s", ad.ad_id)
+            continue
+        pending.append(ad)
+        images.append(image)
+    for ad, value in zip(pending, phash_many(images)):
+        ad.phash = value
 
 
 def _hamming(a: int, b: int) -> int:
-    return bin(a ^ b).count("1")
+    return (a ^ b).bit_count()
 
 
-def dedupe_ads(ads: Iterable[Ad], phash_threshold: int = 5) -> Tuple[List[Ad], int]:
-    """Deduplicate ads using text hash first, then perceptual hash."""
+class PHashIndex:
+    """
+    Multi-index hash for exact Hamming-radius queries over 64-bit pHashes.
 
-    text_seen: set[str] = set()
-    image_hashes: List[int] = []
-    unique: List[Ad] = []
-    dropped = 0
+    The hash is split into ``threshold + 1`` disjoint bit ranges. By pigeonhole, any
+    stored hash within ``threshold`` bits of a query matches it exactly on at least
+    one range, so a query only verifies the few hashes sharing a range value instead
+    of sweeping every kept hash.
+    """
 
-    for ad in ads:
+    bits = 64
+
+    def __init__(self, threshold: int) -> None:
+        self.threshold = threshold
+        self._hashes: List[int] = []
+        parts = max(1, min(threshold + 1, self.bits))
+        self._ranges: List[Tuple[int, int]] = []
+        shift = 0
+        for part in range(parts):
+            width = self.bits // parts + (1 if part < self.bits % parts else 0)
+            self._ranges.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._ranges]
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, value: int) -> None:
+        idx = len(self._hashes)
+        self._hashes.append(value)
+        for table, (shift, mask) in zip(self._tables, self._ranges):
+            table.setdefault((value >> shift) & mask, []).append(idx)
+
+    def has_near(self, value: int) -> bool:
+        if self.threshold < 0:
+            return False
+        if self.threshold >= self.bits:
+            return bool(self._hashes)
+        checked: Set[int] = set()
+        for table, (shift, mask) in zip(self._tables, self._ranges):
+            for idx in table.get((value >> shift) & mask, ()):
+                if idx in checked:
+                    continue
+                checked.add(idx)
+                if _hamming(self._hashes[idx], value) <= self.threshold:
+                    return True
+        return False
+
+
+_NON_WORD = re.compile(r"[\W_]+")
+_SHINGLE_BASE = np.uint64(1_000_003)
+_SHINGLE_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def text_shingles(text: str, size: int) -> np.ndarray:
+    """
+    Sorted unique 32-bit hashes of the character ``size``-grams of ``text``.
+
+    Case, punctuation and emoji are dropped first, so small copy edits and OCR noise
+    only change the few shingles that overlap them.
+    """
+    normalized = _NON_WORD.sub(" ", text.lower()).strip()
+    if len(normalized) < size:
+        return np.zeros(0, dtype=np.uint32)
+    codes = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    count = len(codes) - size + 1
+    # Polynomial hash of every window (wrapping uint64), then the top 32 bits of a multiply-shift.
+    hashed = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        hashed = hashed * _SHINGLE_BASE + codes[offset:offset + count]
+    return np.unique(((hashed * _SHINGLE_MIX) >> np.uint64(32)).astype(np.uint32))
+
+
+def _lsh_params(threshold: float, num_perm: int, miss_weight: float = 0.9) -> Tuple[int, int]:
+    """
+    Bands x rows for ``num_perm`` hashes, minimizing the weighted area of missed pairs
+    above ``threshold`` and spurious candidates below it. Candidates are confirmed with
+    the exact Jaccard, so misses are weighted far more than spurious candidates.
+    """
+    below = np.linspace(0.0, threshold, 64)
+    above = np.linspace(threshold, 1.0, 64)
+    best, best_cost = (1, num_perm), float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        spurious = np.mean(1 - (1 - below**rows) ** bands) * threshold
+        missed = np.mean((1 - above**rows) ** bands) * (1 - threshold)
+        cost = (1 - miss_weight) * spurious + miss_weight * missed
+        if cost < best_cost:
+            best, best_cost = (bands, rows), cost
+    return best
+
+
+class MinHashLSH:
+    """
+    Near-duplicate text index: MinHash signatures of character shingles, bucketed by LSH bands.
+
+    Texts whose shingle sets have Jaccard similarity around ``threshold`` or more share
+    at least one band bucket with high probability, so a query only compares against
+    those candidates; each candidate is then confirmed with the exact Jaccard.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 1) -> None:
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        # x -> a * x + b (mod 2**32) with odd a permutes the 32-bit shingle hashes; the
+        # estimate only has to find candidates, since matches are confirmed exactly.
+        self._mul = rng.integers(0, 2**31, size=self.bands * self.rows, dtype=np.uint32) * np.uint32(2) + np.uint32(1)
+        self._add = rng.integers(0, 2**32, size=self.bands * self.rows, dtype=np.uint32)
+        self._shingles: List[np.ndarray] = []
+        self._tables: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def signatures(self, shingle_sets: Sequence[np.ndarray], batch: int = 128) -> List[np.ndarray]:
+        """MinHash signatures of non-empty shingle sets, ``batch`` sets per vectorized step."""
+        if any(len(shingles) == 0 for shingles in shingle_sets):
+            raise ValueError("MinHash signatures need non-empty shingle sets")
+        signatures: List[np.ndarray] = []
+        for start in range(0, len(shingle_sets), batch):
+            chunk = shingle_sets[start:start + batch]
+            offsets = np.cumsum([0] + [len(shingles) for shingles in chunk[:-1]])
+            hashed = np.concatenate(chunk)[:, None] * self._mul
+            hashed += self._add
+            signatures.extend(np.minimum.reduceat(hashed, offsets, axis=0))
+        return signatures
+
+    def query(self, shingles: np.ndarray, signature: np.ndarray) -> bool:
+        """True if an indexed text has Jaccard similarity >= ``threshold`` with ``shingles``."""
+        checked: Set[int] = set()
+        for band, table in enumerate(self._tables):
+            for idx in table.get(self._band_key(signature, band), ()):
+                if idx in checked:
+                    continue
+                checked.add(idx)
+                other = self._shingles[idx]
+                common = np.intersect1d(shingles, other, assume_unique=True).size
+                if common / (shingles.size + other.size - common) >= self.threshold:
+                    return True
+        return False
+
+    def add(self, shingles: np.ndarray, signature: np.ndarray) -> None:
+        idx = len(self._shingles)
+        self._shingles.append(shingles)
+        for band, table in enumerate(self._tables):
+            table.setdefault(self._band_key(signature, band), []).append(idx)
+
+    def _band_key(self, signature: np.ndarray, band: int) -> bytes:
+        return signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+
+class Deduplicator:
+    """
+    Incremental dedupe in three tiers: exact text hash, near-duplicate text (MinHash
+    LSH, the spec's auxiliary match) and pHash. The first ad admitted wins.
+    """
+
+    def __init__(
+        self,
+        phash_threshold: int = 5,
+        image_cache: Optional[DecodedImageCache] = None,
+        config: Optional[DedupeConfig] = None,
+    ) -> None:
+        self.phash_threshold = phash_threshold
+        self.image_cache = image_cache
+        self.config = config or DedupeConfig()
+        self._text_seen: set[str] = set()
+        self._near_texts = (
+            MinHashLSH(self.config.text_jaccard, self.config.num_perm, self.config.shingle_size)
+            if self.config.text_jaccard > 0
+            else None
+        )
+        self._image_hashes = PHashIndex(phash_threshold)
+
+    def admit(self, ad: Ad) -> bool:
+        """Return ``True`` and remember ``ad`` if it is not a duplicate of an admitted ad."""
+        return self.admit_many([ad])[0]
+
+    def admit_many(self, ads: Sequence[Ad]) -> List[bool]:
+        """:meth:`admit` for each ad in order, with the text sketches computed as one batch."""
+        return [self._admit(ad, near_key) for ad, near_key in zip(ads, self._near_keys(ads))]
+
+    def _near_keys(self, ads: Sequence[Ad]) -> List[Optional[Tuple[np.ndarray, np.ndarray]]]:
+        keys: List[Optional[Tuple[np.ndarray, np.ndarray]]] = [None] * len(ads)
+        if self._near_texts is None:
+            return keys
+        shingle_sets = [text_shingles(_normalize_text(ad), self.config.shingle_size) for ad in ads]
+        # Short copy ("Shop now") is too generic to call two ads the same.
+        # An empty set has no MinHash signature, so at least one shingle is required.
+        min_shingles = max(1, self.config.min_shingles)
+        eligible = [idx for idx, shingles in enumerate(shingle_sets) if shingles.size >= min_shingles]
+        signatures = self._near_texts.signatures([shingle_sets[idx] for idx in eligible])
+        for idx, signature in zip(eligible, signatures):
+            keys[idx] = (shingle_sets[idx], signature)
+        return keys
+
+    def _admit(self, ad: Ad, near_key: Optional[Tuple[np.ndarray, np.ndarray]]) -> bool:
         ad.text_hash = _text_hash(ad)
-        if ad.text_hash in text_seen:
+        if ad.text_hash in self._text_seen:
             logger.debug("Dropping ad %s due to text hash duplicate", ad.ad_id)
-            dropped += 1
-            continue
+            return False
+
+        if near_key is not None and self._near_texts.query(*near_key):
+            logger.debug("Dropping ad %s due to near-duplicate text", ad.ad_id)
+            return False
 
-        if ad.image_path:
+        if ad.phash is None and ad.image_path:
             try:
-                ad.phash = _phash(ad.image_path)
+                ad.phash = _phash(ad.image_path, self.image_cache)
             except Exception as exc:  # noqa: BLE001
                 logger.debug("Failed to compute pHash for ad %s: %s", ad.ad_id, exc)
                 ad.phash = None
 
-        is_duplicate = False
-        if ad.phash is not None:
-            for existing in image_hashes:
-                if _hamming(existing, ad.phash) <= phash_threshold:
-                    is_duplicate = True
-                    break
-
-        if is_duplicate:
+        if ad.phash is not None and self._image_hashes.has_near(ad.phash):
             logger.debug("Dropping ad %s due to perceptual hash match", ad.ad_id)
-            dropped += 1
-            continue
+            return False
 
-        text_seen.add(ad.text_hash)
+        self._text_seen.add(ad.text_hash)
+        if near_key is not None:
+            self._near_texts.add(*near_key)
         if ad.phash is not None:
-            image_hashes.append(ad.phash)
-        unique.append(ad)
+            self._image_hashes.add(ad.phash)
+        return True
+
+
+def dedupe_ads(
+    ads: Iterable[Ad],
+    phash_threshold: int = 5,
+    image_cache: Optional[DecodedImageCache] = None,
+    deduplicator: Optional[Deduplicator] = None,
+) -> Tuple[List[Ad], int]:
+    """
+    Deduplicate ads using text hash first, then near-duplicate text, then perceptual hash.
+
+    Pass a shared ``deduplicator`` to dedupe across several calls (e.g. chunks of one run).
+    """
+
+    deduplicator = deduplicator or Deduplicator(phash_threshold, image_cache)
+    ads = list(ads)
+    phash_ads(ads, deduplicator.image_cache)
+    unique: List[Ad] = []
+    dropped = 0
+
+    for ad, admitted in zip(ads, deduplicator.admit_many(ads)):
+        if admitted:
+            unique.append(ad)
+        else:
+            dropped += 1
 
     logger.info("Deduplicated ads: kept %s, dropped %s", len(unique), dropped)
     return unique, dropped
-
@@ -8,16 +8,34 @@ from src.utils.logger import get_logger
 logger = get_logger(__name__)
 
 
+def _dest_path(ad: Ad, base_dir: str) -> str:
+    return os.path.join(base_dir, f"{ad.ad_id}.jpg")
+
+
+def _mark_invalid(ad: Ad) -> None:
+    ad.image_path = None
+    ad.status = "invalid_media"
+
+
+def download_ad_image(image_repo: ImageRepository, ad: Ad, base_dir: str) -> Ad:
+    try:
+        ad.image_path = image_repo.download(ad.snapshot_url, _dest_path(ad, base_dir))
+        logger.debug("Downloaded ad %s to %s", ad.ad_id, ad.image_path)
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Failed to download ad %s: %s", ad.ad_id, exc)
+        _mark_invalid(ad)
+    return ad
+
+
 def download_ad_images(image_repo: ImageRepository, ads: Iterable[Ad], base_dir: str) -> List[Ad]:
-    updated: List[Ad] = []
-    for ad in ads:
-        filename = f"{ad.ad_id}.jpg"
-        dest_path = os.path.join(base_dir, filename)
-        try:
-            ad.image_path = image_repo.download(ad.snapshot_url, dest_path)
-            logger.debug("Downloaded ad %s to %s", ad.ad_id, ad.image_path)
-        except Exception as exc:  # noqa: BLE001
-            logger.error("Failed to download ad %s: %s", ad.ad_id, exc)
-            ad.image_path = None
-        updated.append(ad)
-    return updated
+    ads = list(ads)
+    paths = image_repo.bulk_download((ad.snapshot_url, _dest_path(ad, base_dir)) for ad in ads)
+    for ad, path in zip(ads, paths):
+        if path is None:
+            _mark_invalid(ad)
+        else:
+            ad.image_path = path
+    invalid = sum(1 for ad in ads if ad.status == "invalid_media")
+    if invalid:
+        logger.warning("Marked %s/%s ads as invalid_media after download retries", invalid, len(ads))
+    return ads
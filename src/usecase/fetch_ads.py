@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Set
+from typing import Callable, List, Set
 
 from src.core.ad import Ad
 from src.interface.ads_repository import AdsRepository
@@ -12,6 +12,8 @@ logger = get_logger(__name__)
 class FetchResult:
     ads: List[Ad]
     new_page_ids: Set[str]
+    guarantee_count: int = 0
+    explore_count: int = 0
 
 
 def _collect_new_page_ids(repository: AdsRepository) -> Set[str]:
@@ -35,4 +37,40 @@ def fetch_ads(repository: AdsRepository, limit: int) -> FetchResult:
         len(explore),
         len(new_page_ids),
     )
-    return FetchResult(ads=combined, new_page_ids=new_page_ids)
+    return FetchResult(
+        ads=combined,
+        new_page_ids=new_page_ids,
+        guarantee_count=len(guarantee),
+        explore_count=len(explore),
+    )
+
+
+def stream_ads(repository: AdsRepository, limit: int, sink: Callable[[Ad], None]) -> FetchResult:
+    """
+    Hand each ad to ``sink`` as soon as the repository yields it.
+
+    The returned result carries counts and page IDs only; the ads went to ``sink``.
+    """
+
+    guarantee = 0
+    for ad in repository.iter_guarantee_ads(limit):
+        sink(ad)
+        guarantee += 1
+    explore = 0
+    for ad in repository.fetch_explore_ads(limit):
+        sink(ad)
+        explore += 1
+    new_page_ids = _collect_new_page_ids(repository)
+    logger.info(
+        "Streamed %s ads (guarantee=%s, explore=%s) with %s new page_ids",
+        guarantee + explore,
+        guarantee,
+        explore,
+        len(new_page_ids),
+    )
+    return FetchResult(
+        ads=[],
+        new_page_ids=new_page_ids,
+        guarantee_count=guarantee,
+        explore_count=explore,
+    )
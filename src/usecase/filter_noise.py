@@ -1,23 +1,35 @@
 from __future__ import annotations
 
 import os
-from typing import Iterable, List, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 import cv2
 
 from src.core.ad import Ad
+from src.utils.image_cache import DecodedImageCache
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
-def _is_image_valid(path: str) -> bool:
+def _load_shape(path: str, image_cache: Optional[DecodedImageCache]) -> Optional[Sequence[int]]:
+    if image_cache is not None:
+        handle = image_cache.get(path)
+        return handle.shape if handle else None
+    image = cv2.imread(path)
+    return image.shape if image is not None else None
+
+
+def _is_image_valid(
+    path: str, image_cache: Optional[DecodedImageCache] = None, shape: Optional[Sequence[int]] = None
+) -> bool:
     if not path or not os.path.exists(path):
         return False
-    image = cv2.imread(path)
-    if image is None:
+    # A shape known from a cached analysis saves decoding the image again.
+    shape = shape or _load_shape(path, image_cache)
+    if shape is None:
         return False
-    height, width = image.shape[:2]
+    height, width = shape[:2]
     if height == 0 or width == 0:
         return False
     aspect_ratio = max(width, height) / max(1, min(width, height))
@@ -31,7 +43,24 @@ def _has_enough_text(ad: Ad) -> bool:
     return 1 <= length <= 2000
 
 
-def filter_noise(ads: Iterable[Ad]) -> Tuple[List[Ad], int]:
+def noise_reason(ad: Ad, image_cache: Optional[DecodedImageCache] = None) -> Optional[str]:
+    """Return why ``ad`` should be dropped, or ``None`` when it passes every check."""
+
+    if not ad.ad_id:
+        return "missing ad_id"
+    if not ad.creative_body and not (ad.ocr_text or "").strip():
+        return "empty text fields"
+    known_shape = ad.analysis.extra.get("image_shape") if ad.analysis else None
+    if not ad.image_path or not _is_image_valid(ad.image_path, image_cache, known_shape):
+        return "invalid image"
+    if not _has_enough_text(ad):
+        return "insufficient OCR text"
+    return None
+
+
+def filter_noise(
+    ads: Iterable[Ad], image_cache: Optional[DecodedImageCache] = None
+) -> Tuple[List[Ad], int]:
     """
     Remove ads that do not meet basic validity checks.
 
@@ -42,20 +71,9 @@ def filter_noise(ads: Iterable[Ad]) -> Tuple[List[Ad], int]:
     dropped = 0
 
     for ad in ads:
-        if not ad.ad_id:
-            logger.debug("Dropping ad with missing ad_id")
-            dropped += 1
-            continue
-        if not ad.creative_body and not (ad.ocr_text or "").strip():
-            logger.debug("Dropping ad %s due to empty text fields", ad.ad_id)
-            dropped += 1
-            continue
-        if not ad.image_path or not _is_image_valid(ad.image_path):
-            logger.debug("Dropping ad %s due to invalid image", ad.ad_id)
-            dropped += 1
-            continue
-        if not _has_enough_text(ad):
-            logger.debug("Dropping ad %s due to insufficient OCR text", ad.ad_id)
+        reason = noise_reason(ad, image_cache)
+        if reason:
+            logger.debug("Dropping ad %s due to %s", ad.ad_id or "<missing>", reason)
             dropped += 1
             continue
         filtered.append(ad)
@@ -1,19 +1,29 @@
 from typing import Iterable, List
 
 from src.core.ad import Ad
-from src.core.tagging import generate_concept_tags
+from src.core.tagging import generate_concept_tags, keyword_tags_many
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def tag_ad(ad: Ad) -> Ad:
+    if ad.analysis is None:
+        logger.warning("Skipping tag generation for ad %s without analysis", ad.ad_id)
+        return ad
+    if ad.tags:
+        return ad
+    ad.tags = generate_concept_tags(ad, ad.analysis)
+    return ad
+
+
 def attach_tags(ads: Iterable[Ad]) -> List[Ad]:
-    enriched: List[Ad] = []
+    ads = list(ads)
+    pending = [ad for ad in ads if ad.analysis is not None and not ad.tags]
+    # One dictionary scan for the whole batch instead of one per ad.
+    for ad, keyword_tags in zip(pending, keyword_tags_many(pending)):
+        ad.tags = generate_concept_tags(ad, ad.analysis, keyword_tags)
     for ad in ads:
         if ad.analysis is None:
             logger.warning("Skipping tag generation for ad %s without analysis", ad.ad_id)
-            enriched.append(ad)
-            continue
-        ad.tags = generate_concept_tags(ad, ad.analysis)
-        enriched.append(ad)
-    return enriched
+    return ads
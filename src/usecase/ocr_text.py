@@ -1,3 +1,4 @@
+import time
 from typing import Iterable, List
 
 from src.core.ad import Ad
@@ -7,17 +8,50 @@ from src.utils.logger import get_logger
 logger = get_logger(__name__)
 
 
+def extract_text_from_ad(engine: OCREngine, ad: Ad) -> Ad:
+    if ad.ocr_text is not None:
+        return ad
+    if not ad.image_path:
+        logger.warning("Skipping OCR for ad %s due to missing image", ad.ad_id)
+        return ad
+    try:
+        result = engine.extract(ad.image_path)
+    except Exception as exc:  # noqa: BLE001
+        logger.error("OCR failed for ad %s: %s", ad.ad_id, exc)
+        ad.ocr_text = ""
+        return ad
+    ad.ocr_text = result.text
+    ad.ocr_words = result.words
+    return ad
+
+
 def extract_text_from_ads(engine: OCREngine, ads: Iterable[Ad]) -> List[Ad]:
-    processed: List[Ad] = []
+    ads = list(ads)
+    targets: List[Ad] = []
     for ad in ads:
+        if ad.ocr_text is not None:
+            continue
         if not ad.image_path:
             logger.warning("Skipping OCR for ad %s due to missing image", ad.ad_id)
-            processed.append(ad)
             continue
-        try:
-            ad.ocr_text = engine.extract_text(ad.image_path)
-        except Exception as exc:  # noqa: BLE001
-            logger.error("OCR failed for ad %s: %s", ad.ad_id, exc)
+        targets.append(ad)
+
+    started = time.perf_counter()
+    results = engine.extract_texts([ad.image_path for ad in targets])
+    for ad, result in zip(targets, results):
+        if result.error is not None:
+            logger.error("OCR failed for ad %s: %s", ad.ad_id, result.error)
             ad.ocr_text = ""
-        processed.append(ad)
-    return processed
+        else:
+            ad.ocr_text = result.text
+            ad.ocr_words = result.words
+        logger.debug("OCR for ad %s took %.2fs", ad.ad_id, result.elapsed)
+
+    if results:
+        logger.info(
+            "OCR processed %s images in %.2fs (avg %.2fs per image)",
+            len(results),
+            time.perf_counter() - started,
+            sum(result.elapsed for result in results) / len(results),
+        )
+    return ads
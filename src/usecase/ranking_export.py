@@ -0,0 +1,109 @@
+"""
+Row-per-ad exports of the day's ranking for notebooks and dashboards.
+
+``ranking.ndjson`` streams one JSON object per line, so it can be read (or tailed)
+without parsing the whole day. ``ranking.parquet`` holds the same rows column by
+column, so a reader can load just ``ad_id`` and ``score`` without the OCR text.
+Both are written atomically.
+"""
+
+from typing import Dict, Iterable, Iterator, List
+
+from src.core.ad import RankedAd
+from src.core.tagging import concept_tag
+from src.utils.atomic_file import atomic_write
+from src.utils.json_encoding import encode_json
+from src.utils.logger import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional export
+    pa = None
+    pq = None
+
+logger = get_logger(__name__)
+
+# Column order of both exports.
+RANKING_COLUMNS = (
+    "rank",
+    "score",
+    "ad_id",
+    "page_id",
+    "page_name",
+    "tags",
+    "concept_tag",
+    "dominant_color",
+    "has_person",
+    "layout_type",
+    "pitch",
+    "text_amount",
+    "layout_bucket",
+    "cta_present",
+    "number_density",
+    "image_path",
+    "snapshot_url",
+    "creative_body",
+    "ocr_text",
+)
+
+
+def ranking_rows(ranked_ads: Iterable[RankedAd]) -> Iterator[Dict[str, object]]:
+    for item in ranked_ads:
+        ad, analysis = item.ad, item.ad.analysis
+        yield {
+            "rank": item.rank,
+            "score": item.score,
+            "ad_id": ad.ad_id,
+            "page_id": ad.page_id,
+            "page_name": ad.page_name,
+            "tags": list(ad.tags),
+            "concept_tag": concept_tag(analysis) if analysis else None,
+            "dominant_color": analysis.dominant_color if analysis else None,
+            "has_person": analysis.has_person if analysis else None,
+            "layout_type": analysis.layout_type if analysis else None,
+            "pitch": analysis.pitch if analysis else None,
+            "text_amount": analysis.text_amount if analysis else None,
+            "layout_bucket": analysis.layout_bucket if analysis else None,
+            "cta_present": analysis.cta_present if analysis else None,
+            "number_density": analysis.number_density if analysis else None,
+            "image_path": ad.image_path,
+            "snapshot_url": ad.snapshot_url,
+            "creative_body": ad.creative_body,
+            "ocr_text": ad.ocr_text,
+        }
+
+
+def save_ranking_ndjson(ranked_ads: Iterable[RankedAd], path: str) -> None:
+    if not path:
+        return
+    count = 0
+    with atomic_write(path, "wb") as file:
+        for row in ranking_rows(ranked_ads):
+            file.write(encode_json(row))
+            file.write(b"\n")
+            count += 1
+    logger.info("Saved %s ranked ads to %s", count, path)
+
+
+def save_ranking_parquet(ranked_ads: Iterable[RankedAd], path: str) -> None:
+    if not path:
+        return
+    if pa is None:
+        logger.warning("pyarrow is not installed; skipping Parquet export to %s", path)
+        return
+    columns: Dict[str, List[object]] = {name: [] for name in RANKING_COLUMNS}
+    for row in ranking_rows(ranked_ads):
+        for name in RANKING_COLUMNS:
+            columns[name].append(row[name])
+    types = {
+        "rank": pa.int32(),
+        "score": pa.float64(),
+        "tags": pa.list_(pa.string()),
+        "has_person": pa.bool_(),
+        "cta_present": pa.bool_(),
+    }
+    table = pa.table({name: pa.array(values, type=types.get(name, pa.string())) for name, values in columns.items()})
+    with atomic_write(path, "wb") as file:
+        pq.write_table(table, file, compression="zstd")
+    logger.info("Saved %s ranked ads to %s", table.num_rows, path)
@@ -1,43 +1,211 @@
+import glob
 import os
-from typing import List
+import re
+from html import escape
+from typing import List, Mapping, Optional, Tuple
 
 from src.core.ad import RankedAd
+from src.usecase.thumbnails import Thumbnail
+from src.usecase.trend import TrendReport, TrendScore
+from src.utils.atomic_file import atomic_write
+from src.utils.json_encoding import encode_json
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Order of the per-ad arrays in ads_index.json.
+INDEX_FIELDS = ("ad_id", "rank", "score", "tags", "color", "page_id", "page_name")
+
+_PAGE_NAME = "page-{:04d}.html"
+_PAGE_PATTERN = re.compile(r"^page-(\d{4,})\.html$")
+
+_STYLE = """
+        body { font-family: sans-serif; max_width: 1200px; margin: 0 auto; padding: 20px; background: #f0f2f5; }
+        h1 { text-align: center; color: #1c1e21; }
+        .grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(300px, 1fr)); gap: 20px; }
+        .ad-card { background: white; border-radius: 8px; padding: 15px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+        .rank { font-size: 1.5em; font-weight: bold; color: #1877f2; }
+        .score { color: #65676b; margin-bottom: 10px; }
+        img { width: 100%; height: auto; border-radius: 4px; }
+        .details { margin-top: 10px; font-size: 0.9em; }
+        .details p { margin: 5px 0; }
+        .trends { display: grid; grid-template-columns: repeat(auto-fit, minmax(260px, 1fr)); gap: 20px; margin-bottom: 30px; }
+        .trend-box { background: white; border-radius: 8px; padding: 15px; }
+        .trend-box h2 { font-size: 1.1em; margin: 0 0 10px; }
+        .trend-box ol { margin: 0; padding-left: 1.4em; }
+        .trend-box li { margin: 4px 0; }
+        .metric { color: #65676b; font-size: 0.85em; }
+        .filters { display: flex; flex-wrap: wrap; gap: 10px; align-items: center; margin-bottom: 20px; }
+        .pager { display: flex; gap: 10px; align-items: center; justify-content: center; margin: 20px 0; }
+"""
+
+# Loads ads_index.json, filters it in the browser and fetches only the page
+# fragments holding the cards currently on screen.
+_PAGED_SCRIPT = """
+const PAGE_SIZE = __PAGE_SIZE__;
+const cards = new Map();
+const loadedPages = new Map();
+let rows = [];
+let matches = [];
+let current = 0;
+
+function loadPage(number) {
+    if (!loadedPages.has(number)) {
+        const name = "pages/page-" + String(number + 1).padStart(4, "0") + ".html";
+        loadedPages.set(number, fetch(name).then((r) => r.text()).then((text) => {
+            const template = document.createElement("template");
+            template.innerHTML = text;
+            template.content.querySelectorAll(".ad-card").forEach((card) => cards.set(card.dataset.adId, card));
+        }));
+    }
+    return loadedPages.get(number);
+}
+
+function fillSelect(id, values) {
+    const select = document.getElementById(id);
+    for (const [value, label] of values) {
+        const option = document.createElement("option");
+        option.value = value;
+        option.textContent = label;
+        select.appendChild(option);
+    }
+    select.addEventListener("change", applyFilters);
+}
+
+function byCount(values) {
+    const counts = new Map();
+    values.forEach((value) => counts.set(value, (counts.get(value) || 0) + 1));
+    return [...counts.entries()].sort((a, b) => b[1] - a[1]);
+}
+
+function applyFilters() {
+    const tag = document.getElementById("filter-tag").value;
+    const color = document.getElementById("filter-color").value;
+    const page = document.getElementById("filter-page").value;
+    matches = rows.filter((row) =>
+        (!tag || row.tags.includes(tag)) && (!color || row.color === color) && (!page || row.page_id === page));
+    current = 0;
+    show();
+}
+
+async function show() {
+    const slice = matches.slice(current * PAGE_SIZE, (current + 1) * PAGE_SIZE);
+    await Promise.all([...new Set(slice.map((row) => Math.floor((row.rank - 1) / PAGE_SIZE)))].map(loadPage));
+    document.getElementById("grid").replaceChildren(...slice.map((row) => cards.get(row.ad_id)).filter(Boolean));
+    const pages = Math.max(1, Math.ceil(matches.length / PAGE_SIZE));
+    document.getElementById("status").textContent = `Page ${current + 1} of ${pages} · ${matches.length} ads`;
+    document.getElementById("prev").disabled = current === 0;
+    document.getElementById("next").disabled = current + 1 >= pages;
+}
+
+function move(step) {
+    current += step;
+    show();
+    window.scrollTo(0, document.getElementById("grid").offsetTop);
+}
+
+fetch("ads_index.json").then((r) => r.json()).then((index) => {
+    rows = index.ads.map((values) => Object.fromEntries(index.fields.map((field, i) => [field, values[i]])));
+    fillSelect("filter-tag", byCount(rows.flatMap((row) => row.tags)).map(([tag, n]) => [tag, `${tag} (${n})`]));
+    fillSelect("filter-color", byCount(rows.map((row) => row.color).filter(Boolean)).map(([c, n]) => [c, `${c} (${n})`]));
+    const names = new Map(rows.map((row) => [row.page_id, row.page_name || row.page_id]));
+    fillSelect("filter-page", byCount(rows.map((row) => row.page_id).filter(Boolean)).map(([id, n]) => [id, `${names.get(id)} (${n})`]));
+    applyFilters();
+});
+"""
+
 
 class HTMLRenderer:
-    def __init__(self, output_path: str):
+    """
+    The daily report. With ``page_size`` 0 every card is inlined into one page; otherwise
+    cards go into ``pages/page-NNNN.html`` fragments of ``page_size`` cards plus a compact
+    ``ads_index.json``, and the report filters the index and loads fragments on demand.
+    The paged report uses ``fetch``, so serve the output directory over HTTP to view it.
+    """
+
+    def __init__(self, output_path: str, page_size: int = 0):
         self.output_path = output_path
+        self.page_size = page_size
 
-    def render(self, ranked_ads: List[RankedAd]) -> None:
+    def render(
+        self,
+        ranked_ads: List[RankedAd],
+        thumbnails: Optional[Mapping[str, List[Thumbnail]]] = None,
+        report: Optional[TrendReport] = None,
+    ) -> None:
         os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
-        
-        html_content = self._generate_html(ranked_ads)
-        
-        with open(self.output_path, "w", encoding="utf-8") as f:
+        thumbnails = thumbnails or {}
+        if self.page_size > 0:
+            html_content = self._render_pages(ranked_ads, thumbnails, report)
+        else:
+            html_content = self._generate_html(ranked_ads, thumbnails, report)
+
+        with atomic_write(self.output_path) as f:
             f.write(html_content)
         logger.info("Generated HTML report at %s", self.output_path)
 
-    def _generate_html(self, ranked_ads: List[RankedAd]) -> str:
-        rows = []
-        for item in ranked_ads:
+    def _image_html(self, item: RankedAd, thumbnails: List[Thumbnail]) -> str:
+        if not thumbnails:
             image_url = f"../data/images/{os.path.basename(item.ad.image_path)}" if item.ad.image_path else ""
-            tags_str = ", ".join(item.ad.tags)
-            rows.append(f"""
-                <div class="ad-card">
+            return f'<img src="{image_url}" alt="Ad Image" loading="lazy">'
+
+        # Paths relative to the report so the output directory can be moved as a whole.
+        base = os.path.dirname(self.output_path) or "."
+        webp = ", ".join(f"{os.path.relpath(t.webp_path, base)} {t.width}w" for t in thumbnails)
+        jpeg = ", ".join(f"{os.path.relpath(t.jpeg_path, base)} {t.width}w" for t in thumbnails)
+        smallest = thumbnails[0]
+        # Cards are at least 300px wide and span the viewport on narrow screens.
+        sizes = "(max-width: 640px) 100vw, 300px"
+        return (
+            f'<picture><source type="image/webp" srcset="{webp}" sizes="{sizes}">'
+            f'<img src="{os.path.relpath(smallest.jpeg_path, base)}" srcset="{jpeg}" sizes="{sizes}" '
+            f'width="{smallest.width}" height="{smallest.height}" alt="Ad Image" loading="lazy" decoding="async">'
+            f"</picture>"
+        )
+
+    def _card_html(self, item: RankedAd, thumbnails: List[Thumbnail]) -> str:
+        image_html = self._image_html(item, thumbnails)
+        tags_str = escape(", ".join(item.ad.tags))
+        ad_id = escape(item.ad.ad_id)
+        return f"""
+                <div class="ad-card" data-ad-id="{ad_id}">
                     <div class="rank">#{item.rank}</div>
                     <div class="score">Score: {item.score:.2f}</div>
-                    <img src="{image_url}" alt="Ad Image" loading="lazy">
+                    {image_html}
                     <div class="details">
-                        <p><strong>ID:</strong> {item.ad.ad_id}</p>
+                        <p><strong>ID:</strong> {ad_id}</p>
                         <p><strong>Tags:</strong> {tags_str}</p>
                         <p><strong>Color:</strong> {item.ad.analysis.dominant_color if item.ad.analysis else 'N/A'}</p>
                     </div>
                 </div>
-            """)
-            
+            """
+
+    def _trend_html(self, report: Optional[TrendReport]) -> str:
+        """Spec 12 sections: BEST3 concepts, surge TOP5 and the per-element rankings."""
+        if report is None:
+            return ""
+
+        def _box(title: str, entries: List[Tuple[str, TrendScore]], metric: str) -> str:
+            if not entries:
+                items = "<li>No data yet</li>"
+            elif metric == "rate":
+                items = "".join(
+                    f'<li>{escape(key)} <span class="metric">rate {score.rate:+.2f} · {score.freq} ads</span></li>'
+                    for key, score in entries
+                )
+            else:
+                items = "".join(
+                    f'<li>{escape(key)} <span class="metric">score {score.count_score:.2f} · {score.freq} ads</span></li>'
+                    for key, score in entries
+                )
+            return f'<div class="trend-box"><h2>{title}</h2><ol>{items}</ol></div>'
+
+        boxes = [_box("BEST3 concepts", report.best3, "score"), _box("Surge TOP5", report.top5, "rate")]
+        boxes.extend(_box(f"By {kind}", entries, "score") for kind, entries in report.elements.items())
+        return f'<div class="trends">{"".join(boxes)}</div>'
+
+    def _document(self, body: str, script: str = "") -> str:
+        script_html = f"<script>{script}</script>" if script else ""
         return f"""
 <!DOCTYPE html>
 <html lang="en">
@@ -45,23 +213,88 @@ class HTMLRenderer:
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Meta Ads Ranking</title>
-    <style>
-        body {{ font-family: sans-serif; max_width: 1200px; margin: 0 auto; padding: 20px; background: #f0f2f5; }}
-        h1 {{ text-align: center; color: #1c1e21; }}
-        .grid {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(300px, 1fr)); gap: 20px; }}
-        .ad-card {{ background: white; border-radius: 8px; padding: 15px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
-        .rank {{ font-size: 1.5em; font-weight: bold; color: #1877f2; }}
-        .score {{ color: #65676b; margin-bottom: 10px; }}
-        img {{ width: 100%; height: auto; border-radius: 4px; }}
-        .details {{ margin-top: 10px; font-size: 0.9em; }}
-        .details p {{ margin: 5px 0; }}
-    </style>
+    <style>{_STYLE}    </style>
 </head>
 <body>
     <h1>Daily Meta Ads Ranking</h1>
-    <div class="grid">
-        {"".join(rows)}
-    </div>
+    {body}
+    {script_html}
 </body>
 </html>
 """
+
+    def _generate_html(
+        self,
+        ranked_ads: List[RankedAd],
+        thumbnails: Mapping[str, List[Thumbnail]],
+        report: Optional[TrendReport] = None,
+    ) -> str:
+        rows = [self._card_html(item, thumbnails.get(item.ad.ad_id, [])) for item in ranked_ads]
+        return self._document(f"""{self._trend_html(report)}
+    <div class="grid">
+        {"".join(rows)}
+    </div>""")
+
+    def _render_pages(
+        self,
+        ranked_ads: List[RankedAd],
+        thumbnails: Mapping[str, List[Thumbnail]],
+        report: Optional[TrendReport],
+    ) -> str:
+        base = os.path.dirname(self.output_path) or "."
+        pages_dir = os.path.join(base, "pages")
+        os.makedirs(pages_dir, exist_ok=True)
+
+        # Each fragment only depends on its own cards, so rendering stays linear in the
+        # number of ads and the report page itself does not grow with them.
+        page_count = 0
+        for start in range(0, len(ranked_ads), self.page_size):
+            chunk = ranked_ads[start:start + self.page_size]
+            with atomic_write(os.path.join(pages_dir, _PAGE_NAME.format(page_count + 1))) as file:
+                file.write("".join(self._card_html(item, thumbnails.get(item.ad.ad_id, [])) for item in chunk))
+            page_count += 1
+        self._remove_stale_pages(pages_dir, page_count)
+
+        index = {
+            "page_size": self.page_size,
+            "fields": INDEX_FIELDS,
+            "ads": [self._index_row(item) for item in ranked_ads],
+        }
+        with atomic_write(os.path.join(base, "ads_index.json"), "wb") as file:
+            file.write(encode_json(index))
+        logger.info("Wrote %s report pages of up to %s ads to %s", page_count, self.page_size, pages_dir)
+
+        body = f"""{self._trend_html(report)}
+    <div class="filters">
+        <label>Tag <select id="filter-tag"><option value="">All</option></select></label>
+        <label>Color <select id="filter-color"><option value="">All</option></select></label>
+        <label>Advertiser <select id="filter-page"><option value="">All</option></select></label>
+    </div>
+    <div id="grid" class="grid"></div>
+    <div class="pager">
+        <button id="prev" onclick="move(-1)">Previous</button>
+        <span id="status">Loading…</span>
+        <button id="next" onclick="move(1)">Next</button>
+    </div>"""
+        return self._document(body, _PAGED_SCRIPT.replace("__PAGE_SIZE__", str(self.page_size)))
+
+    @staticmethod
+    def _index_row(item: RankedAd) -> list:
+        ad = item.ad
+        return [
+            ad.ad_id,
+            item.rank,
+            round(item.score, 4),
+            ad.tags,
+            ad.analysis.dominant_color if ad.analysis else None,
+            ad.page_id,
+            ad.page_name,
+        ]
+
+    @staticmethod
+    def _remove_stale_pages(pages_dir: str, page_count: int) -> None:
+        """Drop fragments left over from an earlier, larger report."""
+        for path in glob.glob(os.path.join(pages_dir, "page-*.html")):
+            match = _PAGE_PATTERN.match(os.path.basename(path))
+            if match and int(match.group(1)) > page_count:
+                os.unlink(path)
@@ -1,44 +1,114 @@
 import asyncio
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List, Set
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 from src.config import PipelineConfig
 from src.core.ad import Ad, RankedAd
+from src.core.run_stats import RunStats
+from src.infra.captured_images import CapturedImageStore
+from src.infra.feature_cache import FeatureCache
 from src.infra.file_downloader import FileDownloader
 from src.infra.meta_ads_scraper import MetaAdsLibraryScraper
+from src.infra.sqlite_storage import SQLiteStorage
 from src.infra.supabase_storage import SupabaseStorage
 from src.infra.tesseract_engine import TesseractEngine
-from src.usecase.analyze_image import analyze_ads
-from src.usecase.dedupe import dedupe_ads
+from src.infra.upsert_fingerprints import UpsertFingerprints
+from src.interface.storage_repository import StorageRepository
+from src.usecase.analyze_image import PersonDetector, analyze_ads
+from src.usecase.cached_features import feature_cache_version, restore_features, store_features
+from src.usecase.dedupe import Deduplicator, dedupe_ads
 from src.usecase.download_images import download_ad_images
 from src.usecase.fetch_ads import FetchResult, fetch_ads
 from src.usecase.filter_noise import filter_noise
 from src.usecase.generate_tags import attach_tags
 from src.usecase.ocr_text import extract_text_from_ads
+from src.usecase.ranking_export import save_ranking_ndjson, save_ranking_parquet
 from src.usecase.render_html import HTMLRenderer
-from src.usecase.save_to_db import save_ads
-from src.usecase.trend import TrendAnalyzer, save_ranking
+from src.usecase.save_to_db import save_ads, save_history, save_run_log
+from src.usecase.stream_pipeline import StreamingPipeline, StreamResult
+from src.usecase.thumbnails import ThumbnailMaker
+from src.usecase.trend import (
+    TrendAnalyzer,
+    TrendReport,
+    TrendScore,
+    save_ranking,
+    save_trend_report,
+    score_counts,
+)
+from src.usecase.trend_history import TrendHistory
+from src.utils.image_cache import DecodedImageCache
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# run_log.step_status keys; steps a failure kept from running are logged as "skipped".
+STEPS = ("fetch", "process", "rank", "render", "persist")
+
+
+@contextmanager
+def _step(stats: RunStats, name: str) -> Iterator[None]:
+    """Record ``name`` as ok or failed in ``stats``; a failure is re-raised."""
+    try:
+        yield
+    except Exception as exc:
+        stats.step_status[name] = "failed"
+        # Keep the first failure; later ones are usually its consequences.
+        if stats.error_summary is None:
+            stats.error_summary = f"{name}: {type(exc).__name__}: {exc}"
+        raise
+    stats.step_status.setdefault(name, "ok")
+
 
 @dataclass(frozen=True)
 class PipelineDependencies:
     ads_repo: MetaAdsLibraryScraper
     downloader: FileDownloader
     ocr_engine: TesseractEngine
-    storage: SupabaseStorage
+    storage: StorageRepository
     renderer: HTMLRenderer
+    image_cache: DecodedImageCache
+    person_detector: PersonDetector
+    feature_cache: Optional[FeatureCache] = None
+    fingerprints: Optional[UpsertFingerprints] = None
+    trend_history: Optional[TrendHistory] = None
+    thumbnails: Optional[ThumbnailMaker] = None
+
+
+def build_storage(config: PipelineConfig) -> StorageRepository:
+    backend = config.storage.backend
+    if backend == "sqlite":
+        return SQLiteStorage(config.storage)
+    if backend != "supabase":
+        raise ValueError(f"Unknown storage backend {backend!r}; expected 'supabase' or 'sqlite'")
+    return SupabaseStorage(config.storage)
 
 
 def build_components(config: PipelineConfig) -> PipelineDependencies:
+    image_cache = DecodedImageCache(config.image_cache_bytes)
+    captured_images = (
+        CapturedImageStore(config.scraper.capture_max_mb * 1024 * 1024) if config.scraper.capture_images else None
+    )
     return PipelineDependencies(
-        ads_repo=MetaAdsLibraryScraper(config.scraper),
-        downloader=FileDownloader(config.data_dir),
-        ocr_engine=TesseractEngine(),
-        storage=SupabaseStorage(config.storage),
-        renderer=HTMLRenderer(config.html_output),
+        ads_repo=MetaAdsLibraryScraper(config.scraper, captured_images=captured_images),
+        downloader=FileDownloader(
+            config.data_dir, config.download, image_cache=image_cache, captured_images=captured_images
+        ),
+        ocr_engine=TesseractEngine(config.ocr, image_cache=image_cache),
+        storage=build_storage(config),
+        renderer=HTMLRenderer(config.html_output, config.html_page_size),
+        image_cache=image_cache,
+        person_detector=PersonDetector(config.analysis.person_max_side, config.analysis.person_workers),
+        feature_cache=FeatureCache(config.feature_cache) if config.feature_cache.path else None,
+        fingerprints=(
+            UpsertFingerprints(config.storage.fingerprint_path, config.storage.fingerprint_max_age_days)
+            # Local SQLite upserts are cheap; skipping only pays off for the remote backend.
+            if config.storage.fingerprint_path and config.storage.backend == "supabase"
+            else None
+        ),
+        trend_history=TrendHistory.load(config.trend.history_path) if config.trend.history_path else None,
+        thumbnails=ThumbnailMaker(config.thumbnails) if config.thumbnails.output_dir else None,
     )
 
 
@@ -46,65 +116,207 @@ class PipelineRunner:
     def __init__(self, config: PipelineConfig, dependencies: PipelineDependencies) -> None:
         self.config = config
         self.deps = dependencies
+        self._feature_version = feature_cache_version(config)
 
     def run(self, limit: int) -> List[Ad]:
         return asyncio.run(self.run_async(limit))
 
     async def run_async(self, limit: int) -> List[Ad]:
-        fetched = await asyncio.to_thread(self._fetch, limit)
-        processed_ads = self._process_ads(fetched.ads)
-        ranked_ads = self._rank(processed_ads)
-        self._render(ranked_ads)
-        await self._persist(processed_ads, fetched.new_page_ids)
+        stats = RunStats(run_date=date.today())
+        async with self.deps.storage as storage:
+            try:
+                processed_ads = await self._run_steps(storage, limit, stats)
+            finally:
+                # A failed run is logged too, so spec 14 monitoring sees it.
+                for name in STEPS:
+                    stats.step_status.setdefault(name, "skipped")
+                await self._log_run(storage, stats)
         logger.info("Pipeline completed")
         return processed_ads
 
+    async def _run_steps(self, storage: StorageRepository, limit: int, stats: RunStats) -> List[Ad]:
+        if self.config.stream.enabled:
+            # Streaming overlaps fetching and processing, so they succeed or fail together.
+            with _step(stats, "fetch"), _step(stats, "process"):
+                result = await self._stream(limit)
+                self._flush_feature_cache()
+            raw_ads, processed_ads, new_page_ids = result.raw_ads, result.ads, result.new_page_ids
+            stats.guarantee_count, stats.explore_count = result.guarantee_count, result.explore_count
+            stats.n_valid = result.fetched - result.dropped_noise
+        else:
+            with _step(stats, "fetch"):
+                fetched = await asyncio.to_thread(self._fetch, limit)
+            raw_ads, new_page_ids = fetched.ads, fetched.new_page_ids
+            stats.guarantee_count, stats.explore_count = fetched.guarantee_count, fetched.explore_count
+            with _step(stats, "process"):
+                processed_ads = self._process_ads(fetched.ads, stats)
+                self._flush_feature_cache()
+        stats.n_fetched = len(raw_ads)
+        stats.n_unique = len(processed_ads)
+        stats.empty_rate = _empty_rate(raw_ads)
+        # Discovered Explore pages; spec 5.2.1 promotion thresholds apply downstream.
+        stats.promotion_candidates = sorted(new_page_ids)
+        with _step(stats, "rank"):
+            await self._backfill_history(stats.run_date)
+            ranked_ads, report, scores = self._rank(processed_ads, stats.run_date)
+        with _step(stats, "render"):
+            self._render(ranked_ads, report)
+        with _step(stats, "persist"):
+            await self._persist(storage, raw_ads, processed_ads, new_page_ids, stats, scores)
+            self._record_history(scores, stats.run_date)
+        return processed_ads
+
+    async def _log_run(self, storage: StorageRepository, stats: RunStats) -> None:
+        try:
+            await save_run_log(storage, stats)
+        except Exception as exc:  # noqa: BLE001
+            # Never mask the run's own failure with a logging one.
+            logger.error("Could not write run_log: %s", exc)
+
+    def _flush_feature_cache(self) -> None:
+        if self.deps.feature_cache is not None:
+            self.deps.feature_cache.flush()
+
     def _fetch(self, limit: int) -> FetchResult:
         return fetch_ads(self.deps.ads_repo, limit)
 
-    def _process_ads(self, ads: List[Ad]) -> List[Ad]:
-        # 1. Download images (Immediate)
-        ads = download_ad_images(self.deps.downloader, ads, self.config.data_dir)
-        
-        # 2. OCR
-        ads = extract_text_from_ads(self.deps.ocr_engine, ads)
-        
-        # 3. Filter Noise
-        ads, dropped_noise = filter_noise(ads)
-        
-        # 4. Dedupe
-        ads, dropped_dupes = dedupe_ads(ads)
-        
+    async def _stream(self, limit: int) -> StreamResult:
+        # 1-6 overlapped: scraped ads flow straight into download/OCR/analysis workers
+        pipeline = StreamingPipeline(
+            self.config.stream,
+            ads_repo=self.deps.ads_repo,
+            downloader=self.deps.downloader,
+            ocr_engine=self.deps.ocr_engine,
+            data_dir=self.config.data_dir,
+            image_cache=self.deps.image_cache,
+            person_detector=self.deps.person_detector,
+            feature_cache=self.deps.feature_cache,
+            feature_version=self._feature_version,
+            dedupe=self.config.dedupe,
+        )
+        return await pipeline.run(limit)
+
+    def _process_ads(self, ads: List[Ad], stats: Optional[RunStats] = None) -> List[Ad]:
+        cache = self.deps.image_cache
+        feature_cache = self.deps.feature_cache
+
+        # Every stage runs chunk by chunk: the downloader decodes each image into the
+        # cache as it lands, and OCR, filter, dedupe and analysis reuse it while it is
+        # still inside the cache budget instead of decoding it again from disk.
+        deduplicator = Deduplicator(image_cache=cache, config=self.config.dedupe)
+        processed: List[Ad] = []
+        dropped_noise = dropped_dupes = restored = 0
+        chunk_size = max(1, self.config.process_chunk_size)
+        for start in range(0, len(ads), chunk_size):
+            # 1. Download images
+            chunk = download_ad_images(self.deps.downloader, ads[start:start + chunk_size], self.config.data_dir)
+
+            # Stages below skip whatever an earlier run already computed for the same creative.
+            if feature_cache is not None:
+                restored += restore_features(feature_cache, chunk, self._feature_version)
+
+            # 2. OCR
+            chunk = extract_text_from_ads(self.deps.ocr_engine, chunk)
+
+            # 3. Filter Noise
+            chunk, dropped = filter_noise(chunk, cache)
+            dropped_noise += dropped
+
+            # 4. Dedupe
+            chunk, dropped = dedupe_ads(chunk, deduplicator=deduplicator)
+            dropped_dupes += dropped
+
+            # 5. Extract Features
+            chunk = analyze_ads(chunk, cache, self.deps.person_detector)
+
+            # 6. Generate Tags
+            processed.extend(attach_tags(chunk))
+
+        if feature_cache is not None:
+            logger.info("Feature cache hits: %s/%s ads", restored, len(ads))
         logger.info(
-            "Post-filter counts: %s valid ads (noise=%s, dupes=%s)",
-            len(ads),
+            "Post-filter counts: %s valid ads (noise=%s, dupes=%s); image cache hits=%s misses=%s",
+            len(processed),
             dropped_noise,
             dropped_dupes,
+            cache.hits,
+            cache.misses,
         )
-        
-        # 5. Extract Features
-        ads = analyze_ads(ads)
-        
-        # 6. Generate Tags
-        ads = attach_tags(ads)
-        return ads
-
-    def _rank(self, ads: List[Ad]) -> List[RankedAd]:
+        if feature_cache is not None:
+            store_features(feature_cache, ads, self._feature_version)
+        if stats is not None:
+            stats.n_valid = len(ads) - dropped_noise
+        return processed
+
+    async def _backfill_history(self, day: date) -> None:
+        history = self.deps.trend_history
+        if history is None or not history.needs_backfill(day):
+            return
+        yesterday = day - timedelta(days=1)
+        rows = await self.deps.storage.fetch_concept_daily(since=yesterday - timedelta(days=history.days - 1))
+        history.backfill(rows, until=yesterday)
+
+    def _rank(self, ads: List[Ad], day: date) -> Tuple[List[RankedAd], TrendReport, Dict[str, TrendScore]]:
         # 7. Trend/Score
         analyzer = TrendAnalyzer(ads)
+        counts = analyzer.counts()
+        if self.deps.trend_history is not None:
+            analyzer.history = self.deps.trend_history.metrics(counts, day)
         ranked = analyzer.rank_ads()
         save_ranking(ranked, self.config.ranking_output)
-        return ranked
+        save_ranking_ndjson(ranked, self.config.ranking_ndjson_output)
+        save_ranking_parquet(ranked, self.config.ranking_parquet_output)
+        report = analyzer.report()
+        save_trend_report(report, self.config.trend.report_output)
+        return ranked, report, score_counts(counts, analyzer.history)
+
+    def _record_history(self, scores: Dict[str, TrendScore], day: date) -> None:
+        history = self.deps.trend_history
+        if history is None:
+            return
+        history.advance({tag: score.freq for tag, score in scores.items()}, day)
+        history.save(self.config.trend.history_path)
 
-    def _render(self, ranked_ads: List[RankedAd]) -> None:
+    def _render(self, ranked_ads: List[RankedAd], report: Optional[TrendReport] = None) -> None:
         # 8. Render HTML
-        self.deps.renderer.render(ranked_ads)
+        thumbnails = None
+        if self.deps.thumbnails is not None:
+            thumbnails = self.deps.thumbnails.make(item.ad for item in ranked_ads)
+        self.deps.renderer.render(ranked_ads, thumbnails, report)
 
-    async def _persist(self, ads: List[Ad], new_page_ids: Set[str]) -> None:
-        async with self.deps.storage as storage:
-            await save_ads(storage, ads)
-            if new_page_ids:
-                await storage.upsert_page_ids(new_page_ids)
+    async def _persist(
+        self,
+        storage: StorageRepository,
+        raw_ads: List[Ad],
+        ads: List[Ad],
+        new_page_ids: Set[str],
+        stats: RunStats,
+        scores: Dict[str, TrendScore],
+    ) -> None:
+        report = await save_ads(storage, ads, self.deps.fingerprints)
+        if report.skipped:
+            stats.step_status["persist"] = "skipped"
+        elif not report.ok:
+            # upsert reports failed chunks instead of raising; the run still goes on.
+            stats.step_status["persist"] = "partial"
+            stats.error_summary = stats.error_summary or f"persist: {report.rows_failed} ad rows failed to upsert"
+        if new_page_ids:
+            await storage.upsert_page_ids(new_page_ids)
+        # concept_daily keeps every scored tag, not just concept tags, so the trend
+        # history can be rebuilt from it.
+        await save_history(storage, stats, raw_ads, ads, scores)
+        # Only ads confirmed in the table are skipped next time; everything else,
+        # including a run whose upsert was skipped, is scraped again.
+        stored = set(report.stored_ids)
+        self.deps.ads_repo.mark_processed(ad for ad in ads if ad.ad_id in stored)
+
+
+def _empty_rate(ads: List[Ad]) -> float:
+    """Share of fetched ads with neither body text nor OCR text (spec 14 monitoring)."""
+    if not ads:
+        return 0.0
+    empty = sum(1 for ad in ads if not ad.creative_body.strip() and not (ad.ocr_text or "").strip())
+    return empty / len(ads)
 
 
 def run_pipeline(config: PipelineConfig, limit: int = 10) -> List[Ad]:
@@ -1,8 +1,15 @@
 import asyncio
-from typing import Iterable, List
+import json
+from dataclasses import asdict
+from datetime import date
+from typing import Iterable, List, Mapping, Optional
 
 from src.core.ad import Ad
-from src.interface.storage_repository import StorageRepository
+from src.core.run_stats import RunStats
+from src.core.tagging import concept_tag, person_bucket
+from src.infra.upsert_fingerprints import UpsertFingerprints
+from src.interface.storage_repository import StorageRepository, UpsertReport
+from src.usecase.trend import TrendScore
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -27,10 +34,136 @@ def _serialize_ad(ad: Ad) -> dict:
     }
 
 
-async def save_ads(storage: StorageRepository, ads: Iterable[Ad]) -> None:
+def _serialize_raw_ad(ad: Ad, fetch_date: date) -> dict:
+    return {
+        "fetch_date": fetch_date.isoformat(),
+        "ad_id": ad.ad_id,
+        "page_id": ad.page_id,
+        "page_name": ad.page_name,
+        "body": ad.creative_body,
+        "status": ad.status,
+    }
+
+
+def _serialize_unique_ad(ad: Ad, fetch_date: date) -> dict:
+    analysis = ad.analysis
+    features = {"ocr_text": ad.ocr_text, "tags": ad.tags}
+    if analysis:
+        features.update(asdict(analysis))
+    return {
+        "fetch_date": fetch_date.isoformat(),
+        "ad_id": ad.ad_id,
+        "page_id": ad.page_id,
+        "image_path": ad.image_path,
+        "text_hash": ad.text_hash,
+        # Hex keeps the full unsigned 64 bits; SQLite integers are signed.
+        "phash": f"{ad.phash:016x}" if ad.phash is not None else None,
+        "dominant_color": analysis.dominant_color if analysis else None,
+        "person_bucket": person_bucket(analysis) if analysis else None,
+        "text_amount_bucket": analysis.text_amount if analysis else None,
+        "layout_bucket": analysis.layout_bucket if analysis else None,
+        "cta_present": analysis.cta_present if analysis else None,
+        "number_density_bucket": analysis.number_density if analysis else None,
+        "concept_tag": concept_tag(analysis) if analysis else None,
+        "features_json": json.dumps(features, ensure_ascii=False, default=str),
+    }
+
+
+def _serialize_concept_score(tag: str, score: TrendScore, day: date) -> dict:
+    return {
+        "date": day.isoformat(),
+        "concept_tag": tag,
+        "freq": score.freq,
+        "rate": score.rate,
+        "persistence": score.persistence,
+        "count_score": score.count_score,
+        "impr_score": score.impr_score,
+        "score_selected_type": score.selected_type,
+    }
+
+
+def _serialize_run(stats: RunStats) -> dict:
+    return {
+        "date": stats.run_date.isoformat(),
+        "n_fetched": stats.n_fetched,
+        "n_valid": stats.n_valid,
+        "n_unique": stats.n_unique,
+        "guarantee_count": stats.guarantee_count,
+        "explore_count": stats.explore_count,
+        "explore_ratio": stats.explore_ratio,
+        "empty_rate": stats.empty_rate,
+        "impr_available_ratio": stats.impr_available_ratio,
+        "promotion_candidates_json": json.dumps(stats.promotion_candidates),
+        "step_status_json": json.dumps(stats.step_status),
+        "error_summary": stats.error_summary,
+        "is_reference": stats.is_reference,
+    }
+
+
+async def save_ads(
+    storage: StorageRepository, ads: Iterable[Ad], fingerprints: Optional[UpsertFingerprints] = None
+) -> UpsertReport:
+    """
+    Upsert ``ads``; with ``fingerprints``, only rows that changed since their last
+    successful upsert are sent, and only rows in successful chunks are remembered.
+
+    ``stored_ids`` of the report lists the ads known to be in the table afterwards:
+    rows of successful chunks plus unchanged ones. It stays empty when the upsert
+    was skipped.
+    """
+
     records = [_serialize_ad(ad) for ad in ads]
-    await storage.upsert(records)
+    if fingerprints is None:
+        report = await storage.upsert(records)
+        if not report.skipped:
+            report.stored_ids = [
+                record["id"] for chunk in report.chunks if chunk.ok
+                for record in records[chunk.start:chunk.start + chunk.rows]
+            ]
+        return report
+
+    changed = fingerprints.changed(records)
+    report = await storage.upsert([records[idx] for idx, _, _ in changed])
+    report.unchanged = len(records) - len(changed)
+    if not report.skipped:
+        # Chunk offsets index into the sent rows, i.e. into ``changed``.
+        written = [
+            (row_id, fingerprint)
+            for chunk in report.chunks
+            if chunk.ok
+            for _, row_id, fingerprint in changed[chunk.start:chunk.start + chunk.rows]
+        ]
+        fingerprints.commit(written)
+        sent = {idx for idx, _, _ in changed}
+        report.stored_ids = [record["id"] for idx, record in enumerate(records) if idx not in sent]
+        report.stored_ids.extend(row_id for row_id, _ in written)
+    logger.info("Ads upsert: sent %s, unchanged %s, failed %s", report.rows_sent, report.unchanged, report.rows_failed)
+    return report
+
+
+def save_ads_sync(
+    storage: StorageRepository, ads: Iterable[Ad], fingerprints: Optional[UpsertFingerprints] = None
+) -> UpsertReport:
+    return asyncio.run(save_ads(storage, ads, fingerprints))
+
+
+async def save_history(
+    storage: StorageRepository,
+    stats: RunStats,
+    raw_ads: Iterable[Ad],
+    unique_ads: Iterable[Ad],
+    concept_scores: Mapping[str, TrendScore],
+) -> None:
+    """Write the spec 13 history tables; backends without them ignore the calls."""
+
+    day = stats.run_date
+    await storage.upsert_raw_ads([_serialize_raw_ad(ad, day) for ad in raw_ads])
+    await storage.upsert_unique_ads([_serialize_unique_ad(ad, day) for ad in unique_ads])
+    await storage.upsert_concept_daily(
+        [_serialize_concept_score(tag, score, day) for tag, score in concept_scores.items()]
+    )
 
 
-def save_ads_sync(storage: StorageRepository, ads: Iterable[Ad]) -> None:
-    asyncio.run(save_ads(storage, ads))
+async def save_run_log(storage: StorageRepository, stats: RunStats) -> None:
+    """Append the run's spec 14 monitoring row, whether or not the run succeeded."""
+    await storage.log_run(_serialize_run(stats))
@@ -0,0 +1,243 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from src.config import DedupeConfig, StreamConfig
+from src.core.ad import Ad
+from src.interface.ads_repository import AdsRepository
+from src.interface.image_repository import ImageRepository
+from src.interface.ocr_engine import OCREngine
+from src.infra.feature_cache import FeatureCache
+from src.usecase.analyze_image import PersonDetector, analyze_ad
+from src.usecase.cached_features import restore_features, store_features
+from src.usecase.dedupe import Deduplicator
+from src.usecase.download_images import download_ad_image
+from src.usecase.fetch_ads import stream_ads
+from src.usecase.filter_noise import noise_reason
+from src.usecase.generate_tags import tag_ad
+from src.usecase.ocr_text import extract_text_from_ad
+from src.utils.image_cache import DecodedImageCache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Sentinel telling a stage worker that its inbox is drained.
+_DONE = object()
+
+Item = Tuple[int, Ad]
+Handler = Callable[[Item], Awaitable[Optional[Item]]]
+
+
+@dataclass
+class StreamResult:
+    ads: List[Ad] = field(default_factory=list)
+    raw_ads: List[Ad] = field(default_factory=list)  # every fetched ad, for ads_raw
+    new_page_ids: Set[str] = field(default_factory=set)
+    fetched: int = 0
+    guarantee_count: int = 0
+    explore_count: int = 0
+    dropped_noise: int = 0
+    dropped_dupes: int = 0
+
+
+class StreamingPipeline:
+    """
+    Run download -> OCR -> filter/dedupe -> analyze/tag as overlapping stages.
+
+    The scraper runs in a worker thread and pushes each ad into a bounded queue as
+    soon as its page is extracted, so downloads start while later pages are still
+    being scrolled. Every queue holds at most ``queue_size`` ads, which blocks the
+    scraper when downstream stages fall behind and keeps memory flat for any limit.
+    Filtering and dedupe run on a single worker because the dedupe index is shared,
+    and ads reach it in scrape order so the same duplicate survives on every run.
+    """
+
+    def __init__(
+        self,
+        config: StreamConfig,
+        ads_repo: AdsRepository,
+        downloader: ImageRepository,
+        ocr_engine: OCREngine,
+        data_dir: str,
+        phash_threshold: int = 5,
+        image_cache: Optional[DecodedImageCache] = None,
+        person_detector: Optional[PersonDetector] = None,
+        feature_cache: Optional[FeatureCache] = None,
+        feature_version: str = "",
+        dedupe: Optional[DedupeConfig] = None,
+    ) -> None:
+        self.config = config
+        self.ads_repo = ads_repo
+        self.downloader = downloader
+        self.ocr_engine = ocr_engine
+        self.data_dir = data_dir
+        self.phash_threshold = phash_threshold
+        self.image_cache = image_cache
+        self.person_detector = person_detector
+        self.feature_cache = feature_cache
+        self.feature_version = feature_version
+        self.dedupe = dedupe
+
+    async def run(self, limit: int) -> StreamResult:
+        size = max(1, self.config.queue_size)
+        download_workers = max(1, self.config.download_workers)
+        ocr_workers = max(1, self.config.ocr_workers)
+        analysis_workers = max(1, self.config.analysis_workers)
+
+        to_download: asyncio.Queue = asyncio.Queue(size)
+        to_ocr: asyncio.Queue = asyncio.Queue(size)
+        to_reorder: asyncio.Queue = asyncio.Queue(size)
+        to_gate: asyncio.Queue = asyncio.Queue(size)
+        to_analyze: asyncio.Queue = asyncio.Queue(size)
+
+        result = StreamResult()
+        collected: List[Item] = []
+        # Ads between the scraper and the end of _reorder; bounds its buffer to ``size``.
+        window = asyncio.Semaphore(size)
+        deduplicator = Deduplicator(self.phash_threshold, self.image_cache, self.dedupe)
+
+        def _download(ad: Ad) -> None:
+            download_ad_image(self.downloader, ad, self.data_dir)
+            if self.feature_cache is not None:
+                restore_features(self.feature_cache, [ad], self.feature_version)
+
+        def _remember(ad: Ad) -> None:
+            if self.feature_cache is not None:
+                store_features(self.feature_cache, [ad], self.feature_version)
+
+        async def download(item: Item) -> Item:
+            await asyncio.to_thread(_download, item[1])
+            return item
+
+        async def ocr(item: Item) -> Item:
+            await asyncio.to_thread(extract_text_from_ad, self.ocr_engine, item[1])
+            return item
+
+        def _gate(ad: Ad) -> bool:
+            reason = noise_reason(ad, self.image_cache)
+            if reason:
+                logger.debug("Dropping ad %s due to %s", ad.ad_id or "<missing>", reason)
+                result.dropped_noise += 1
+                _remember(ad)
+                return False
+            if not deduplicator.admit(ad):
+                result.dropped_dupes += 1
+                _remember(ad)
+                return False
+            return True
+
+        async def gate(item: Item) -> Optional[Item]:
+            admitted = await asyncio.to_thread(_gate, item[1])
+            return item if admitted else None
+
+        async def analyze(item: Item) -> None:
+            ad = await asyncio.to_thread(analyze_ad, item[1], self.image_cache, self.person_detector)
+            collected.append((item[0], tag_ad(ad)))
+            _remember(ad)
+
+        await asyncio.gather(
+            self._produce(limit, to_download, download_workers, result, window),
+            self._stage("download", to_download, to_ocr, download, download_workers, ocr_workers, to_reorder),
+            self._stage("ocr", to_ocr, to_reorder, ocr, ocr_workers, 1, to_reorder),
+            self._reorder(to_reorder, to_gate, window),
+            self._stage("gate", to_gate, to_analyze, gate, 1, analysis_workers),
+            self._stage("analyze", to_analyze, None, analyze, analysis_workers, 0),
+        )
+
+        # Restore fetch order so ranking ties break the same way as the batch path.
+        collected.sort(key=lambda item: item[0])
+        result.ads = [ad for _, ad in collected]
+        logger.info(
+            "Streamed pipeline processed %s ads (fetched=%s, noise=%s, dupes=%s)",
+            len(result.ads),
+            result.fetched,
+            result.dropped_noise,
+            result.dropped_dupes,
+        )
+        return result
+
+    async def _produce(
+        self, limit: int, outbox: asyncio.Queue, consumers: int, result: StreamResult, window: asyncio.Semaphore
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        sequence = 0
+
+        async def _put(item: Item) -> None:
+            await window.acquire()
+            await outbox.put(item)
+
+        def _push(ad: Ad) -> None:
+            nonlocal sequence
+            # Blocks the scraper thread while the download queue is full, or while the
+            # oldest unfinished ad holds the reorder window open.
+            asyncio.run_coroutine_threadsafe(_put((sequence, ad)), loop).result()
+            result.raw_ads.append(ad)
+            sequence += 1
+
+        try:
+            fetched = await asyncio.to_thread(stream_ads, self.ads_repo, limit, _push)
+            result.new_page_ids = fetched.new_page_ids
+            result.guarantee_count = fetched.guarantee_count
+            result.explore_count = fetched.explore_count
+        finally:
+            result.fetched = sequence
+            for _ in range(consumers):
+                await outbox.put(_DONE)
+
+    async def _stage(
+        self,
+        name: str,
+        inbox: asyncio.Queue,
+        outbox: Optional[asyncio.Queue],
+        handler: Handler,
+        workers: int,
+        downstream_workers: int,
+        lost: Optional[asyncio.Queue] = None,
+    ) -> None:
+        async def worker() -> None:
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    return
+                try:
+                    forwarded = await handler(item)
+                except Exception as exc:  # noqa: BLE001
+                    logger.error("Stage %s failed for ad %s: %s", name, item[1].ad_id, exc)
+                    if lost is not None:
+                        # Tell _reorder not to wait for this sequence.
+                        await lost.put((item[0], None))
+                    continue
+                if forwarded is not None and outbox is not None:
+                    await outbox.put(forwarded)
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if outbox is not None:
+            for _ in range(downstream_workers):
+                await outbox.put(_DONE)
+
+    async def _reorder(self, inbox: asyncio.Queue, outbox: asyncio.Queue, window: asyncio.Semaphore) -> None:
+        """
+        Forward items in sequence order, whatever order the parallel stages finished in.
+
+        An item whose ad is ``None`` marks a sequence that failed upstream; it is
+        skipped rather than waited for. Each sequence leaving here frees its slot in
+        ``window``, so at most the window's size is ever held in ``pending``.
+        """
+        pending: Dict[int, Tuple[int, Optional[Ad]]] = {}
+        expected = 0
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                break
+            pending[item[0]] = item
+            while expected in pending:
+                ready = pending.pop(expected)
+                if ready[1] is not None:
+                    await outbox.put(ready)
+                window.release()
+                expected += 1
+        for sequence in sorted(pending):
+            if pending[sequence][1] is not None:
+                await outbox.put(pending[sequence])
+            window.release()
+        await outbox.put(_DONE)
@@ -0,0 +1,119 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+import cv2
+
+from src.config import ThumbnailConfig
+from src.core.ad import Ad
+from src.usecase.cached_features import file_content_hash
+from src.utils.atomic_file import atomic_write
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# {source hash}_{source width}-{width}x{height}.{webp,jpg}
+_NAME_PATTERN = re.compile(r"^([0-9a-f]{16})_(\d+)-(\d+)x(\d+)\.(webp|jpg)$")
+
+
+@dataclass
+class Thumbnail:
+    width: int
+    height: int
+    webp_path: str
+    jpeg_path: str
+
+
+class ThumbnailMaker:
+    """
+    Report-sized WebP and JPEG derivatives of each creative, one pair per configured width.
+
+    Files are named after the source image's content hash and width, so a derivative
+    that already exists is current by construction and is reused without decoding
+    the source again. Sources are never upscaled: a width above the source's maps to
+    the full-size derivative.
+    """
+
+    def __init__(self, config: ThumbnailConfig) -> None:
+        self.config = config
+
+    def make(self, ads: Iterable[Ad]) -> Dict[str, List[Thumbnail]]:
+        ads = [ad for ad in ads if ad.image_path]
+        if not ads:
+            return {}
+        os.makedirs(self.config.output_dir, exist_ok=True)
+        existing = self._scan()
+        with ThreadPoolExecutor(max_workers=max(1, self.config.workers)) as pool:
+            results = list(pool.map(lambda ad: self._thumbnails_for(ad, existing), ads))
+        thumbnails = {ad.ad_id: thumbs for ad, thumbs in zip(ads, results) if thumbs}
+        logger.info("Thumbnails ready for %s/%s ads", len(thumbnails), len(ads))
+        return thumbnails
+
+    def _scan(self) -> Dict[str, Tuple[int, Dict[int, int]]]:
+        """``source hash -> (source width, {width: height})`` of every derivative pair on disk."""
+        seen: Dict[Tuple[str, int, int, int], set] = {}
+        for name in os.listdir(self.config.output_dir):
+            match = _NAME_PATTERN.match(name)
+            if match:
+                key, source_width, width, height, ext = match.groups()
+                seen.setdefault((key, int(source_width), int(width), int(height)), set()).add(ext)
+        existing: Dict[str, Tuple[int, Dict[int, int]]] = {}
+        for (key, source_width, width, height), exts in seen.items():
+            if len(exts) == 2:
+                existing.setdefault(key, (source_width, {}))[1][width] = height
+        return existing
+
+    def _thumbnails_for(self, ad: Ad, existing: Dict[str, Tuple[int, Dict[int, int]]]) -> List[Thumbnail]:
+        if ad.content_hash is None:
+            ad.content_hash = file_content_hash(ad.image_path)
+        if not ad.content_hash:
+            return []
+        key = ad.content_hash[:16]
+        widths = sorted(set(self.config.widths))
+        if key in existing:
+            source_width, cached = existing[key]
+            targets = sorted({min(width, source_width) for width in widths})
+            if all(width in cached for width in targets):
+                return [self._thumbnail(key, source_width, width, cached[width]) for width in targets]
+        else:
+            cached = {}
+
+        try:
+            return self._render(ad.image_path, key, widths, cached)
+        except (cv2.error, OSError, ValueError) as exc:
+            logger.warning("Thumbnails for ad %s failed: %s", ad.ad_id, exc)
+            return []
+
+    def _render(self, path: str, key: str, widths: List[int], cached: Dict[int, int]) -> List[Thumbnail]:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"could not decode {path}")
+        source_height, source_width = image.shape[:2]
+        thumbnails = []
+        for width in sorted({min(width, source_width) for width in widths}):
+            height = max(1, round(source_height * width / source_width))
+            if cached.get(width) != height:
+                resized = image
+                if width != source_width:
+                    resized = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+                self._write(resized, self._thumbnail(key, source_width, width, height))
+            thumbnails.append(self._thumbnail(key, source_width, width, height))
+        return thumbnails
+
+    def _write(self, image, thumbnail: Thumbnail) -> None:
+        encodings = (
+            (thumbnail.jpeg_path, ".jpg", [cv2.IMWRITE_JPEG_QUALITY, self.config.jpeg_quality]),
+            (thumbnail.webp_path, ".webp", [cv2.IMWRITE_WEBP_QUALITY, self.config.webp_quality]),
+        )
+        for path, ext, params in encodings:
+            ok, encoded = cv2.imencode(ext, image, params)
+            if not ok:
+                raise ValueError(f"could not encode {path}")
+            with atomic_write(path, "wb") as file:
+                file.write(encoded.tobytes())
+
+    def _thumbnail(self, key: str, source_width: int, width: int, height: int) -> Thumbnail:
+        stem = os.path.join(self.config.output_dir, f"{key}_{source_width}-{width}x{height}")
+        return Thumbnail(width, height, f"{stem}.webp", f"{stem}.jpg")
@@ -1,10 +1,14 @@
 import json
-import os
 from collections import Counter
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from itertools import chain
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
 
 from src.core.ad import Ad, RankedAd
+from src.core.tagging import person_bucket
+from src.utils.atomic_file import atomic_write
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -25,57 +29,150 @@ class TrendScore:
     count_score: float = 0.0
     impr_score: Optional[float] = None
     selected_type: str = "count"  # 'count' or 'impr'
+    freq: int = 0
+    rate: float = 0.0
+    persistence: float = 0.0
+
+
+ELEMENT_KINDS = ("color", "person", "layout")
+
+
+@dataclass
+class TrendReport:
+    """Spec 11.4 outputs: BEST3 concepts, the surge TOP5 and per-element rankings."""
+
+    best3: List[Tuple[str, TrendScore]] = field(default_factory=list)
+    top5: List[Tuple[str, TrendScore]] = field(default_factory=list)
+    elements: Dict[str, List[Tuple[str, TrendScore]]] = field(default_factory=dict)
+
+
+def _score_arrays(
+    keys: Sequence[str], freq: np.ndarray, history: Mapping[str, TrendMetrics]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Spec 11.1 ``(rate, persistence, count_score)`` for every key at once."""
+    missing = TrendMetrics()
+    metrics = [history.get(key, missing) for key in keys]
+    yesterday = np.fromiter((m.freq_yesterday for m in metrics), dtype=np.float64, count=len(keys))
+    ma3_today = np.fromiter((m.ma3_today for m in metrics), dtype=np.float64, count=len(keys))
+    ma3_yesterday = np.fromiter((m.ma3_yesterday for m in metrics), dtype=np.float64, count=len(keys))
+    rate = (freq - yesterday) / (yesterday + 1)
+    persistence = ma3_today / (ma3_yesterday + 1)
+    return rate, persistence, rate + persistence
+
+
+def score_counts(counts: Mapping[str, int], history: Mapping[str, TrendMetrics]) -> Dict[str, TrendScore]:
+    """Spec 11.1 CountScore for each tag (or concept) count of the day."""
+    keys = list(counts)
+    freq = np.fromiter(counts.values(), dtype=np.float64, count=len(keys))
+    rate, persistence, count_score = _score_arrays(keys, freq, history)
+    # Impr Score stays None until impression ranges are collected.
+    return {
+        key: TrendScore(count_score=c, impr_score=None, freq=int(f), rate=r, persistence=p)
+        for key, f, r, p, c in zip(keys, freq, rate.tolist(), persistence.tolist(), count_score.tolist())
+    }
+
+
+def _top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest values, best first, without sorting the rest."""
+    if k <= 0 or not values.size:
+        return np.zeros(0, dtype=np.intp)
+    if k < values.size:
+        candidates = np.argpartition(-values, k - 1)[:k]
+    else:
+        candidates = np.arange(values.size)
+    return candidates[np.argsort(-values[candidates], kind="stable")]
 
 
 class TrendAnalyzer:
-    def __init__(self, ads: List[Ad], history: Dict[str, TrendMetrics] = None):
+    """
+    Scores tags, concepts and elements for one day and ranks ads by their best tag.
+
+    Ad tags are held as a CSR-style ad x tag incidence (``indptr``/``indices``), so tag
+    frequencies are one ``bincount`` and each ad's best tag score is one
+    ``maximum.reduceat`` instead of a Python loop over every ad and tag.
+    """
+
+    def __init__(self, ads: List[Ad], history: Optional[Mapping[str, TrendMetrics]] = None):
         self.ads = ads
         self.history = history or {}
-        self.tag_counts = Counter()
-        for ad in ads:
-            for tag in ad.tags:
-                self.tag_counts[tag] += 1
+
+        flat_tags = list(chain.from_iterable(ad.tags for ad in ads))
+        self._tags = list(dict.fromkeys(flat_tags))
+        vocabulary = {tag: idx for idx, tag in enumerate(self._tags)}
+        self._indices = np.fromiter(map(vocabulary.__getitem__, flat_tags), dtype=np.intp, count=len(flat_tags))
+        lengths = np.fromiter(map(len, (ad.tags for ad in ads)), dtype=np.intp, count=len(ads))
+        self._indptr = np.concatenate(([0], np.cumsum(lengths)))
+        self._freq = np.bincount(self._indices, minlength=len(self._tags))
+        self.tag_counts = Counter(dict(zip(self._tags, self._freq.tolist())))
+
+        # Concepts ({color}×{person}×{layout}, see tagging.concept_tag) and single elements
+        # (``color:red``) are grouped counts over the analysed ads' element columns.
+        analyses = [ad.analysis for ad in ads if ad.analysis]
+        colors = [analysis.dominant_color for analysis in analyses]
+        persons = [person_bucket(analysis) for analysis in analyses]
+        layouts = [analysis.layout_type for analysis in analyses]
+        self.concept_counts = Counter(
+            {f"{c}×{p}×{l}": freq for (c, p, l), freq in Counter(zip(colors, persons, layouts)).items()}
+        )
+        self.element_counts: Counter = Counter()
+        for kind, values in zip(ELEMENT_KINDS, (colors, persons, layouts)):
+            self.element_counts.update({f"{kind}:{value}": freq for value, freq in Counter(values).items()})
+
+    def counts(self) -> Dict[str, int]:
+        """Today's frequency of every tag, concept and element key, for the trend history."""
+        return {**self.tag_counts, **self.concept_counts, **self.element_counts}
 
     def calculate_scores(self) -> Dict[str, TrendScore]:
-        scores = {}
-        for tag, freq in self.tag_counts.items():
-            metrics = self.history.get(tag, TrendMetrics())
-            
-            # Count Score
-            rate = (freq - metrics.freq_yesterday) / (metrics.freq_yesterday + 1)
-            persistence = metrics.ma3_today / (metrics.ma3_yesterday + 1)
-            count_score = rate + persistence
-
-            # Impr Score (Placeholder as we don't have real impr data yet)
-            impr_score = None
-            
-            scores[tag] = TrendScore(count_score=count_score, impr_score=impr_score)
-        return scores
+        return score_counts(self.tag_counts, self.history)
 
     def rank_ads(self) -> List[RankedAd]:
-        # Simple ranking based on count score of the ad's most significant tag
-        # In a real scenario, we might aggregate scores of all tags
-        
-        scores = self.calculate_scores()
-        
-        scored_ads = []
-        for ad in self.ads:
-            max_score = 0.0
-            for tag in ad.tags:
-                if tag in scores:
-                    max_score = max(max_score, scores[tag].count_score)
-            scored_ads.append((ad, max_score))
-            
-        scored_ads.sort(key=lambda x: x[1], reverse=True)
-        
+        # An ad scores as its most significant tag, floored at 0 like an ad without tags.
+        _, _, tag_scores = _score_arrays(self._tags, self._freq.astype(np.float64), self.history)
+        ad_scores = np.zeros(len(self.ads), dtype=np.float64)
+        tagged = np.diff(self._indptr) > 0
+        if tagged.any():
+            ad_scores[tagged] = np.maximum.reduceat(tag_scores[self._indices], self._indptr[:-1][tagged])
+        np.maximum(ad_scores, 0.0, out=ad_scores)
+
+        order = np.argsort(-ad_scores, kind="stable")
         return [
-            RankedAd(ad=ad, score=score, rank=i + 1)
-            for i, (ad, score) in enumerate(scored_ads)
+            RankedAd(ad=self.ads[idx], score=score, rank=rank + 1)
+            for rank, (idx, score) in enumerate(zip(order.tolist(), ad_scores[order].tolist()))
         ]
 
+    def report(self, best: int = 3, top: int = 5) -> TrendReport:
+        concepts = list(self.concept_counts)
+        freq = np.fromiter(self.concept_counts.values(), dtype=np.float64, count=len(concepts))
+        rate, persistence, count_score = _score_arrays(concepts, freq, self.history)
+
+        def _entries(picked: np.ndarray) -> List[Tuple[str, TrendScore]]:
+            return [
+                (
+                    concepts[idx],
+                    TrendScore(
+                        count_score=float(count_score[idx]),
+                        freq=int(freq[idx]),
+                        rate=float(rate[idx]),
+                        persistence=float(persistence[idx]),
+                    ),
+                )
+                for idx in picked.tolist()
+            ]
+
+        report = TrendReport(best3=_entries(_top_k(count_score, best)), top5=_entries(_top_k(rate, top)))
+        element_scores = score_counts(self.element_counts, self.history)
+        for kind in ELEMENT_KINDS:
+            prefix = f"{kind}:"
+            ranked = sorted(
+                ((key[len(prefix):], score) for key, score in element_scores.items() if key.startswith(prefix)),
+                key=lambda item: item[1].count_score,
+                reverse=True,
+            )
+            report.elements[kind] = ranked
+        return report
+
 
 def save_ranking(ranked_ads: List[RankedAd], path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
     serialized = [
         {
             "rank": item.rank,
@@ -86,6 +183,34 @@ def save_ranking(ranked_ads: List[RankedAd], path: str) -> None:
         }
         for item in ranked_ads
     ]
-    with open(path, "w", encoding="utf-8") as file:
+    with atomic_write(path) as file:
         json.dump(serialized, file, indent=2)
     logger.info("Saved ranking to %s", path)
+
+
+def save_trend_report(report: TrendReport, path: str) -> None:
+    if not path:
+        return
+
+    def _serialize(entries: List[Tuple[str, TrendScore]]) -> List[dict]:
+        return [
+            {
+                "key": key,
+                "freq": score.freq,
+                "rate": score.rate,
+                "persistence": score.persistence,
+                "count_score": score.count_score,
+                "impr_score": score.impr_score,
+                "score_selected_type": score.selected_type,
+            }
+            for key, score in entries
+        ]
+
+    serialized = {
+        "best3": _serialize(report.best3),
+        "top5": _serialize(report.top5),
+        "elements": {kind: _serialize(entries) for kind, entries in report.elements.items()},
+    }
+    with atomic_write(path) as file:
+        json.dump(serialized, file, indent=2, ensure_ascii=False)
+    logger.info("Saved trend report to %s", path)
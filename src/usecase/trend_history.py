@@ -0,0 +1,164 @@
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from src.usecase.trend import TrendMetrics
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DayLike = Union[date, str]
+
+
+class TrendHistory:
+    """
+    Per-tag daily frequencies for the last ``days`` days, as one tag x day matrix.
+
+    Column ``-1`` is ``last_date`` and each column to the left is one day earlier.
+    A run reads the three days before it to build :class:`TrendMetrics` and then
+    records its own counts, so each day costs O(#tags) instead of rescanning past
+    ads. Re-running a day replaces that day's column rather than adding to it.
+    """
+
+    # Today plus the three previous days that spec 11.1 needs for ma3_yesterday.
+    days = 4
+
+    def __init__(
+        self,
+        tags: Optional[List[str]] = None,
+        freqs: Optional[np.ndarray] = None,
+        last_date: Optional[date] = None,
+    ) -> None:
+        self._tags: List[str] = list(tags or [])
+        self._index: Dict[str, int] = {tag: idx for idx, tag in enumerate(self._tags)}
+        self._freqs = freqs if freqs is not None else np.zeros((0, self.days), dtype=np.int32)
+        self.last_date = last_date
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    @classmethod
+    def load(cls, path: str) -> "TrendHistory":
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with np.load(path, allow_pickle=False) as state:
+                freqs = state["freqs"].astype(np.int32)
+                tags = [str(tag) for tag in state["tags"]]
+                last_date = date.fromisoformat(str(state["last_date"])) if tags else None
+        except (OSError, KeyError, ValueError) as exc:
+            logger.warning("Ignoring unreadable trend history %s: %s", path, exc)
+            return cls()
+        if freqs.shape != (len(tags), cls.days):
+            logger.warning("Ignoring trend history %s with unexpected shape %s", path, freqs.shape)
+            return cls()
+        return cls(tags, freqs, last_date)
+
+    def save(self, path: str) -> None:
+        if not path:
+            return
+        # Tags that did not appear anywhere in the window carry no information.
+        keep = self._freqs.any(axis=1)
+        tags = np.array([tag for tag, kept in zip(self._tags, keep) if kept], dtype=str)
+        Path(os.path.dirname(path) or ".").mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            tags=tags,
+            freqs=self._freqs[keep],
+            last_date=np.array(self.last_date.isoformat() if self.last_date else ""),
+        )
+        os.replace(tmp_path, path)
+
+    def needs_backfill(self, day: date) -> bool:
+        """True when yesterday is missing from the window, e.g. on a first run or after a gap."""
+        return self.last_date is None or self.last_date < day - timedelta(days=1)
+
+    def metrics(self, counts: Mapping[str, int], day: date) -> Dict[str, TrendMetrics]:
+        """Spec 11.1 inputs for ``day``, given that day's tag counts."""
+        back1, back2, back3 = (self._day_column(day - timedelta(days=offset)) for offset in (1, 2, 3))
+        metrics: Dict[str, TrendMetrics] = {}
+        for tag, freq in counts.items():
+            idx = self._index.get(tag)
+            y1 = int(back1[idx]) if idx is not None else 0
+            y2 = int(back2[idx]) if idx is not None else 0
+            y3 = int(back3[idx]) if idx is not None else 0
+            metrics[tag] = TrendMetrics(
+                freq_today=freq,
+                freq_yesterday=y1,
+                ma3_today=(freq + y1 + y2) / 3,
+                ma3_yesterday=(y1 + y2 + y3) / 3,
+            )
+        return metrics
+
+    def advance(self, counts: Mapping[str, int], day: date) -> None:
+        """Record ``day``'s counts, sliding the window forward if ``day`` is new."""
+        if self.last_date is None or day > self.last_date:
+            shift = self.days if self.last_date is None else min(self.days, (day - self.last_date).days)
+            self._freqs = np.roll(self._freqs, -shift, axis=1)
+            self._freqs[:, -shift:] = 0
+            self.last_date = day
+        column = self._column_of(day)
+        if column is None:
+            logger.warning("Not recording trend counts for %s: older than the %s-day window", day, self.days)
+            return
+
+        new_tags = [tag for tag in counts if tag not in self._index]
+        if new_tags:
+            for tag in new_tags:
+                self._index[tag] = len(self._tags)
+                self._tags.append(tag)
+            self._freqs = np.vstack([self._freqs, np.zeros((len(new_tags), self.days), dtype=np.int32)])
+
+        self._freqs[:, column] = 0
+        if counts:
+            rows = np.fromiter((self._index[tag] for tag in counts), dtype=np.intp, count=len(counts))
+            self._freqs[rows, column] = np.fromiter(counts.values(), dtype=np.int32, count=len(counts))
+
+    def backfill(self, rows: Iterable[Tuple[DayLike, str, int]], until: Optional[date] = None) -> None:
+        """
+        Rebuild the window from stored ``(date, tag, freq)`` rows in one vectorized pass.
+
+        Only the ``days`` days ending at ``until`` (default: the newest row) are kept;
+        older rows are ignored, so it is safe to pass the whole concept_daily table.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        days = np.array([str(day)[:10] for day, _, _ in rows], dtype="datetime64[D]")
+        tags = np.array([tag for _, tag, _ in rows], dtype=object)
+        freqs = np.array([freq for _, _, freq in rows], dtype=np.int32)
+
+        newest = np.datetime64(until, "D") if until is not None else days.max()
+        offsets = (newest - days).astype(np.int64)
+        in_window = (offsets >= 0) & (offsets < self.days)
+        if not in_window.any():
+            return
+        if self.last_date is not None and days[in_window].max() <= np.datetime64(self.last_date, "D"):
+            return  # the stored rows are no newer than what the window already holds
+        unique_tags, tag_rows = np.unique(tags[in_window], return_inverse=True)
+        matrix = np.zeros((len(unique_tags), self.days), dtype=np.int32)
+        matrix[tag_rows, self.days - 1 - offsets[in_window]] = freqs[in_window]
+
+        self._tags = [str(tag) for tag in unique_tags]
+        self._index = {tag: idx for idx, tag in enumerate(self._tags)}
+        self._freqs = matrix
+        self.last_date = date.fromisoformat(str(newest))
+        logger.info("Backfilled trend history for %s tags up to %s", len(self._tags), self.last_date)
+
+    def _column_of(self, day: date) -> Optional[int]:
+        if self.last_date is None:
+            return None
+        offset = (self.last_date - day).days
+        if not 0 <= offset < self.days:
+            return None
+        return self.days - 1 - offset
+
+    def _day_column(self, day: date) -> np.ndarray:
+        column = self._column_of(day)
+        if column is None:
+            return np.zeros(len(self._tags), dtype=np.int32)
+        return self._freqs[:, column]
@@ -0,0 +1,42 @@
+import os
+import pathlib
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+# The umask can only be read by setting it, which would race with threads creating
+# files, so it is read once at import and put straight back.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _target_mode(path: str) -> int:
+    """Mode the file would get from a plain ``open``: the existing file's, else 0666 minus umask."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", encoding: Optional[str] = "utf-8") -> Iterator[IO]:
+    """
+    Open a temp file next to ``path`` and rename it over ``path`` once the block succeeds.
+
+    Readers see either the previous file or the complete new one, never a partial
+    write; if the block raises, the temp file is removed and ``path`` is untouched.
+    """
+    directory = os.path.dirname(path) or "."
+    pathlib.Path(directory).mkdir(parents=True, exist_ok=True)
+    # Same directory, so the rename stays on one filesystem.
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".part")
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else encoding) as file:
+            yield file
+        # mkstemp creates the file 0600 and the rename would keep that.
+        os.chmod(tmp_path, _target_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
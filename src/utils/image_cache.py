@@ -0,0 +1,127 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class ImageHandle:
+    """A decoded creative with lazily derived grayscale and HSV planes."""
+
+    def __init__(self, path: str, bgr: np.ndarray, cache: Optional["DecodedImageCache"] = None) -> None:
+        self.path = path
+        self.bgr = bgr
+        self._gray: Optional[np.ndarray] = None
+        self._hsv: Optional[np.ndarray] = None
+        self._cache = cache
+        # Bytes the cache has counted for this handle; only touched under the cache lock,
+        # so removal subtracts exactly what was added even if a plane lands mid-eviction.
+        self._counted = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self) -> tuple:
+        return self.bgr.shape
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            with self._lock:
+                if self._gray is None:
+                    self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+                    self._grew(self._gray.nbytes)
+        return self._gray
+
+    @property
+    def hsv(self) -> np.ndarray:
+        if self._hsv is None:
+            with self._lock:
+                if self._hsv is None:
+                    self._hsv = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV)
+                    self._grew(self._hsv.nbytes)
+        return self._hsv
+
+    @property
+    def nbytes(self) -> int:
+        return sum(plane.nbytes for plane in (self.bgr, self._gray, self._hsv) if plane is not None)
+
+    def _grew(self, added: int) -> None:
+        if self._cache is not None:
+            self._cache._account(self, added)
+
+
+class DecodedImageCache:
+    """
+    Thread-safe LRU of decoded images bounded by the bytes held in their planes.
+
+    Each creative is decoded once (from disk, or straight from downloaded bytes) and
+    shared by filtering, OCR, dedupe and analysis. Evicted handles stay valid for
+    callers that still hold them; they just stop counting against the budget.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, ImageHandle]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str) -> Optional[ImageHandle]:
+        key = os.path.normpath(path)
+        with self._lock:
+            handle = self._entries.get(key)
+            if handle is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return handle
+            self.misses += 1
+        image = cv2.imread(path)
+        if image is None:
+            return None
+        return self._insert(key, image)
+
+    def put_bytes(self, path: str, data: bytes) -> Optional[ImageHandle]:
+        """Decode freshly downloaded bytes without reading the file back from disk."""
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            self.discard(path)
+            return None
+        return self._insert(os.path.normpath(path), image)
+
+    def discard(self, path: str) -> None:
+        with self._lock:
+            handle = self._entries.pop(os.path.normpath(path), None)
+            if handle is not None:
+                self._bytes -= handle._counted
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _insert(self, key: str, image: np.ndarray) -> ImageHandle:
+        handle = ImageHandle(key, image, cache=self)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous._counted
+            self._entries[key] = handle
+            handle._counted = handle.nbytes
+            self._bytes += handle._counted
+            self._evict()
+        return handle
+
+    def _account(self, handle: ImageHandle, added: int) -> None:
+        with self._lock:
+            if self._entries.get(handle.path) is handle:
+                handle._counted += added
+                self._bytes += added
+                self._evict()
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it alone exceeds the budget.
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted._counted